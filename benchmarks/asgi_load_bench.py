@@ -0,0 +1,140 @@
+"""
+Load test of the link creation and the links list against a running deployment, to compare
+the WSGI deployment with the ASGI one side by side:
+
+    gunicorn -b 127.0.0.1:8000 -w 4 core.wsgi:application
+    uvicorn core.asgi:application --port 8001 --workers 1
+
+    python benchmarks/asgi_load_bench.py http://127.0.0.1:8000 --email user@example.com --password secret
+    python benchmarks/asgi_load_bench.py http://127.0.0.1:8001 --email user@example.com --password secret
+
+The added links point to a slow site served by the script itself, every page is answered after --site-delay
+seconds like a remote site would be, so the numbers show how many link adds wait on the network at once.
+Each run adds new urls, the links of a run are deleted at the end unless --keep is given.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+PAGE = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Bench page {path}</title>'
+    '<meta property="og:title" content="Bench page {path}">'
+    '<meta property="og:description" content="Page served by the load test after a delay">'
+    '<meta property="og:type" content="article"></head><body>{body}</body></html>'
+)
+
+
+async def serve_slow_site(host, port, delay):
+    async def handle(reader, writer):
+        try:
+            request = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        method, path = request.split(b' ', 2)[:2]
+        await asyncio.sleep(delay)
+        body = PAGE.format(path=path.decode(), body='<p>filler</p>' * 200).encode()
+        writer.write(
+            b'HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n'
+            b'Content-Length: %d\r\nConnection: close\r\n\r\n' % len(body)
+        )
+        if method != b'HEAD':
+            writer.write(body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    return await asyncio.start_server(handle, host, port, backlog=4096)
+
+
+async def timed(client, method, url, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        ok = response.status_code < 400
+    except httpx.HTTPError:
+        response, ok = None, False
+    return time.perf_counter() - start, ok, response
+
+
+async def run_phase(name, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(request):
+        async with semaphore:
+            return await request
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(limited(request) for request in requests))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, ok, response in results if ok)
+    errors = len(results) - len(latencies)
+    if latencies:
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        print(
+            f'{name:<8}{len(results):>8}{errors:>8}{len(results) / elapsed:>10.1f}'
+            f'{quantiles[49] * 1000:>10.0f}{quantiles[94] * 1000:>10.0f}{quantiles[98] * 1000:>10.0f}'
+            f'{elapsed:>10.2f}'
+        )
+    else:
+        print(f'{name:<8}{len(results):>8}{errors:>8}  every request failed')
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('target', help='base url of the deployment, e.g. http://127.0.0.1:8000')
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--links', type=int, default=300, help='number of links to add')
+    parser.add_argument('--reads', type=int, default=1000, help='number of links list requests')
+    parser.add_argument('--concurrency', type=int, default=300)
+    parser.add_argument('--site-host', default='127.0.0.1')
+    parser.add_argument('--site-port', type=int, default=8765)
+    parser.add_argument('--site-delay', type=float, default=0.5, help='seconds the slow site waits before answering')
+    parser.add_argument('--keep', action='store_true', help='keep the added links')
+    args = parser.parse_args()
+
+    site = await serve_slow_site(args.site_host, args.site_port, args.site_delay)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with site, httpx.AsyncClient(base_url=args.target, limits=limits, timeout=300, trust_env=False) as client:
+        response = await client.post('/api/auth/token/', json={'email': args.email, 'password': args.password})
+        response.raise_for_status()
+        client.headers['Authorization'] = f'Bearer {response.json()["access"]}'
+        client.headers['Accept'] = 'application/json'
+
+        run = uuid.uuid4().hex[:8]
+        site_url = f'http://{args.site_host}:{args.site_port}'
+        print(f'{args.target}: {args.links} link adds and {args.reads} list reads, concurrency {args.concurrency}, '
+              f'site delay {args.site_delay}s')
+        print(f'{"phase":<8}{"requests":>8}{"errors":>8}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}'
+              f'{"total s":>10}')
+        await run_phase('create', [
+            timed(client, 'POST', '/api/links/', json={'link': f'{site_url}/{run}/{n}'}) for n in range(args.links)
+        ], args.concurrency)
+        await run_phase('list', [
+            timed(client, 'GET', '/api/links/', params={'page_size': 20, 'fields': 'id,title,url'})
+            for _ in range(args.reads)
+        ], args.concurrency)
+
+        if not args.keep:
+            ids = []
+            url = '/api/links/'
+            params = {'host': args.site_host, 'fields': 'id,url', 'page_size': 500}
+            while url:
+                page = (await client.get(url, params=params)).json()
+                ids += [link['id'] for link in page['results'] if f'/{run}/' in link['url']]
+                url, params = page['next'], None
+            for pk in ids:
+                await client.delete(f'/api/links/{pk}/')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""
+Micro-benchmark of the link metadata extraction: the previous BeautifulSoup path that
+downloads and parses the whole document against the streaming head-only parser.
+
+    python benchmarks/head_parser_bench.py [corpus_dir] [--repeat N]
+
+corpus_dir holds saved pages (*.html, *.htm). Without it a synthetic corpus of pages
+with 50 KB, 500 KB and 3 MB bodies is used.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from links.links_head_parser import parse_head_meta  # noqa: E402
+
+CHUNK_SIZE = 16 * 1024
+MAX_HEAD_BYTES = 512 * 1024
+
+HEAD = (
+    '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>Saved page {n}</title>'
+    '<meta name="description" content="Plain description {n}">'
+    '<meta property="og:title" content="Open graph title {n}">'
+    '<meta property="og:description" content="Open graph description {n}">'
+    '<meta property="og:url" content="https://example.com/pages/{n}">'
+    '<meta property="og:type" content="article">'
+    '<meta property="og:image" content="https://example.com/pages/{n}.png">'
+    '<link rel="stylesheet" href="/style.css"><script>var page = {n};</script></head>'
+)
+PARAGRAPH = '<div class="row"><p>Lorem ipsum <a href="/x">dolor</a> sit amet, <b>consectetur</b> adipiscing.</p></div>\n'
+
+
+def synthetic_corpus():
+    pages = []
+    for n, body_bytes in enumerate((50 * 1024, 500 * 1024, 3 * 1024 * 1024)):
+        body = PARAGRAPH * (body_bytes // len(PARAGRAPH))
+        pages.append((f'synthetic-{body_bytes // 1024}k', (HEAD.format(n=n) + '<body>' + body + '</body></html>').encode()))
+    return pages
+
+
+def load_corpus(path):
+    return [
+        (name, (Path(path) / name).read_bytes())
+        for name in sorted(os.listdir(path)) if name.endswith(('.html', '.htm'))
+    ]
+
+
+def soup_meta(content):
+    """
+    Extraction as it was done before: the whole document is parsed and searched tag by tag
+    """
+    soup = BeautifulSoup(content, "html.parser")
+    meta = {}
+    for prop in ('og:title', 'og:description', 'og:url', 'og:type', 'og:image'):
+        if soup.find("meta", property=prop):
+            meta[prop] = soup.find("meta", property=prop)['content']
+    if soup.find('title'):
+        meta['title'] = soup.find('title').text
+    if soup.find("meta", {'name': 'description'}):
+        meta['description'] = soup.find("meta", {'name': 'description'})['content']
+    return meta
+
+
+def soup_path(content):
+    # the previous path received the whole body before parsing
+    body = b''.join(content[i:i + CHUNK_SIZE] for i in range(0, len(content), CHUNK_SIZE))
+    return soup_meta(body)
+
+
+def streaming_path(content):
+    chunks = (content[i:i + CHUNK_SIZE] for i in range(0, len(content), CHUNK_SIZE))
+    return parse_head_meta(chunks, MAX_HEAD_BYTES)
+
+
+def measure(func, content, repeat):
+    tracemalloc.start()
+    func(content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(content)
+    return (time.perf_counter() - start) / repeat, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('corpus', nargs='?')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    print(f'{"page":<32}{"size KB":>9}{"soup ms":>10}{"stream ms":>11}{"speedup":>9}{"soup MB":>9}{"stream MB":>11}  same')
+    total_soup = total_stream = 0
+    for name, content in corpus:
+        soup_time, soup_peak, soup_result = measure(soup_path, content, args.repeat)
+        stream_time, stream_peak, stream_result = measure(streaming_path, content, args.repeat)
+        total_soup += soup_time
+        total_stream += stream_time
+        print(
+            f'{name[:31]:<32}{len(content) / 1024:>9.0f}{soup_time * 1000:>10.2f}{stream_time * 1000:>11.2f}'
+            f'{soup_time / stream_time:>8.1f}x{soup_peak / 2 ** 20:>9.1f}{stream_peak / 2 ** 20:>11.2f}'
+            f'  {soup_result == stream_result}'
+        )
+    print(f'total: soup {total_soup * 1000:.1f} ms, stream {total_stream * 1000:.1f} ms, '
+          f'speedup {total_soup / total_stream:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
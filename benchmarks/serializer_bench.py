@@ -0,0 +1,110 @@
+"""
+Benchmark of the links list serialization: UserLinkSerializer over model instances against
+ValuesSerializer over values() rows, on an in-memory database.
+
+    python benchmarks/serializer_bench.py [--sizes 100,10000,100000] [--repeat N] [--fields id,title,url,image]
+
+The settings module is taken from DJANGO_SETTINGS_MODULE (core.settings by default), only its database
+is replaced. Both paths include the query and the JSON rendering, the outputs are compared byte for byte.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.DATABASES['default'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+settings.ALLOWED_HOSTS = ['*']
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+
+from links.links_fast_serializers import ValuesSerializer  # noqa: E402
+from links.models import UserLink  # noqa: E402
+from links.serializers import UserLinkSerializer  # noqa: E402
+from users.models import CustomUser  # noqa: E402
+
+
+def populate(user, count):
+    UserLink.objects.filter(user=user).delete()
+    now = timezone.now()
+    UserLink.objects.bulk_create(
+        (
+            UserLink(
+                user=user,
+                title=f'Saved page {n}',
+                description='Open graph description of the page ' * 8,
+                url=f'https://example.com/pages/{n}',
+                url_hash=f'{n:064x}',
+                link_type='article',
+                # most pictures are unique, a part of the links share the default one
+                image='static/default.png' if n % 4 == 0 else f'static/linkpics/{n % 256:02x}/{n:064x}.webp',
+                creation_date=now - timezone.timedelta(minutes=n),
+                change_date=now - timezone.timedelta(minutes=n),
+            )
+            for n in range(count)
+        ),
+        batch_size=5000,
+    )
+
+
+def make_request(query):
+    return Request(RequestFactory().get('/api/links/', query, HTTP_HOST='testserver'))
+
+
+def model_path(user, request):
+    queryset = UserLink.objects.filter(user=user).order_by('-change_date', '-id')
+    data = UserLinkSerializer(queryset, many=True, context={'request': request}).data
+    return JSONRenderer().render(data)
+
+
+def values_path(user, request):
+    serializer = ValuesSerializer(UserLinkSerializer(context={'request': request}))
+    queryset = UserLink.objects.filter(user=user).order_by('-change_date', '-id')
+    return JSONRenderer().render(serializer.serialize(serializer.values(queryset)))
+
+
+def measure(func, user, request, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(user, request)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='100,10000,100000')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fields', help='sparse fieldset, as in ?fields=')
+    args = parser.parse_args()
+
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    user = CustomUser.objects.create(email='bench@example.com', username='bench')
+    request = make_request({'fields': args.fields} if args.fields else {})
+
+    print(f'{"links":>8}{"model rows/s":>15}{"values rows/s":>15}{"speedup":>9}  same')
+    for size in (int(size) for size in args.sizes.split(',')):
+        populate(user, size)
+        model_time, model_result = measure(model_path, user, request, args.repeat)
+        values_time, values_result = measure(values_path, user, request, args.repeat)
+        print(
+            f'{size:>8}{size / model_time:>15,.0f}{size / values_time:>15,.0f}'
+            f'{model_time / values_time:>8.1f}x  {model_result == values_result}'
+        )
+
+
+if __name__ == '__main__':
+    main()
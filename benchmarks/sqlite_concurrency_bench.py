@@ -0,0 +1,171 @@
+"""
+Benchmark of the links list reads while link ingestion writes run alongside, on a database file
+with the plain sqlite3 backend against the tuned core.sqlite3 one of the settings with SQLITE_WAL on:
+
+    python benchmarks/sqlite_concurrency_bench.py [--readers 8] [--writers 2] [--duration 10] [--links 5000]
+
+Every profile runs in its own process on a new database in a temporary directory. The reader threads
+load the first page of a user's links the way the links list does, the writer threads store new links
+through links_ingest_utils.create_link with the metadata already fetched. Each operation ends the way a
+request does, with close_old_connections, so the default profile opens a connection per operation.
+The settings module is taken from DJANGO_SETTINGS_MODULE (core.settings by default), only its database
+is replaced.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+PROFILES = {
+    # the database settings before the tuning: rollback journal, a connection per request
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 0},
+    'tuned': {'ENGINE': 'core.sqlite3', 'CONN_MAX_AGE': 10 * 60, 'CONN_HEALTH_CHECKS': True},
+}
+USERS = 20
+PAGE_SIZE = 20
+
+
+def run_profile(profile, args):
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default'] = {**PROFILES[profile], 'NAME': str(Path(args.directory) / 'db.sqlite3')}
+    settings.ALLOWED_HOSTS = ['*']
+    settings.LINKS_THUMBNAIL_PROCESSES = 0
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import OperationalError, close_old_connections, connection
+    from django.test import RequestFactory
+    from django.utils import timezone
+    from rest_framework.request import Request
+
+    from links.links_fast_serializers import ValuesSerializer
+    from links.links_ingest_utils import DEFAULT_IMAGE, create_link
+    from links.models import UserLink
+    from links.serializers import UserLinkSerializer
+    from users.models import CustomUser
+
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    users = [
+        CustomUser.objects.create_user(email=f'bench{n}@example.com', password='benchpass123').pk
+        for n in range(USERS)
+    ]
+    now = timezone.now()
+    UserLink.objects.bulk_create(
+        (
+            UserLink(
+                user_id=users[n % USERS],
+                title=f'Saved page {n}',
+                description='Open graph description of the page ' * 8,
+                url=f'https://example.com/pages/{n}',
+                url_hash=f'{n:064x}',
+                host='example.com',
+                link_type='article',
+                image=DEFAULT_IMAGE,
+                creation_date=now - timezone.timedelta(minutes=n),
+                change_date=now - timezone.timedelta(minutes=n),
+            )
+            for n in range(args.links)
+        ),
+        batch_size=5000,
+    )
+    journal_mode = connection.cursor().execute('PRAGMA journal_mode').fetchone()[0]
+    close_old_connections()
+    connection.close()
+
+    request = Request(RequestFactory().get('/api/links/', {'fields': 'id,title,url'}, HTTP_HOST='testserver'))
+    serializer = ValuesSerializer(UserLinkSerializer(context={'request': request}))
+    stop = threading.Event()
+    results = {'read': [], 'write': [], 'read_errors': 0, 'write_errors': 0}
+    lock = threading.Lock()
+
+    def read(n):
+        queryset = UserLink.objects.filter(user_id=users[n % USERS]).order_by('-change_date', '-id')
+        return serializer.serialize(serializer.values(queryset)[:PAGE_SIZE])
+
+    def write(n):
+        create_link(users[n % USERS], {
+            'title': f'Ingested page {n}',
+            'description': 'Open graph description of the page',
+            'url': f'https://example.org/ingested/{threading.get_ident()}/{n}',
+            'link_type': 'article',
+            'image': DEFAULT_IMAGE,
+        })
+
+    def worker(kind, func):
+        latencies, errors, n = [], 0, 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                func(n)
+                latencies.append(time.perf_counter() - start)
+            except OperationalError:
+                errors += 1
+            finally:
+                close_old_connections()
+            n += 1
+        connection.close()
+        with lock:
+            results[kind] += latencies
+            results[f'{kind}_errors'] += errors
+
+    threads = [threading.Thread(target=worker, args=('read', read)) for _ in range(args.readers)]
+    threads += [threading.Thread(target=worker, args=('write', write)) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(json.dumps({'profile': profile, 'journal_mode': journal_mode, **results}))
+
+
+def summary(kind, result, duration):
+    latencies = sorted(result[kind])
+    p50, p95 = (statistics.quantiles(latencies, n=100)[i] * 1000 for i in (49, 94)) if len(latencies) > 1 else (0, 0)
+    return f'{len(latencies) / duration:>10.1f}{p50:>9.1f}{p95:>9.1f}{result[f"{kind}_errors"]:>8}'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--readers', type=int, default=8, help='threads loading the links list')
+    parser.add_argument('--writers', type=int, default=2, help='threads storing new links')
+    parser.add_argument('--duration', type=float, default=10, help='seconds every profile runs')
+    parser.add_argument('--links', type=int, default=5000, help='links in the database before the run')
+    parser.add_argument('--profile', choices=PROFILES, help=argparse.SUPPRESS)
+    parser.add_argument('--directory', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        run_profile(args.profile, args)
+        return
+
+    print(f'{args.readers} readers, {args.writers} writers, {args.duration}s per profile, {args.links} links')
+    print(f'{"profile":<9}{"journal":<9}{"reads/s":>10}{"p50 ms":>9}{"p95 ms":>9}{"errors":>8}'
+          f'{"writes/s":>10}{"p50 ms":>9}{"p95 ms":>9}{"errors":>8}')
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            output = subprocess.run(
+                [sys.executable, __file__, '--profile', profile, '--directory', directory,
+                 '--readers', str(args.readers), '--writers', str(args.writers),
+                 '--duration', str(args.duration), '--links', str(args.links)],
+                check=True, capture_output=True, text=True, env={**os.environ, 'SQLITE_WAL': 'True'},
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f'{profile:<9}{result["journal_mode"]:<9}{summary("read", result, args.duration)}'
+              f'{summary("write", result, args.duration)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,5 +3,14 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# the links list, retrieve and create are served by the native async views of links.async_views
+os.environ.setdefault('LINKS_ASYNC_VIEWS', 'True')
+# every request runs its sync code on a thread of its own, a kept connection would never be reused
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
+
+from core.schema import schema_documents  # noqa: E402
+
+# the OpenAPI schema and the documentation pages are prepared before the first request
+schema_documents.load()
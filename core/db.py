@@ -0,0 +1,23 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def write_atomic(using=None):
+    """
+    transaction.atomic for the blocks that read before they write. On the core.sqlite3 backend the outermost
+    block starts with BEGIN IMMEDIATE: it waits up to busy_timeout for the write lock, where a deferred
+    transaction would fail at once with "database is locked" when another connection wrote after its read.
+    The read-only blocks stay deferred and do not queue behind the writers
+    """
+    connection = transaction.get_connection(using)
+    previous = getattr(connection, 'begin_immediate', False)
+    connection.begin_immediate = True
+    try:
+        with transaction.atomic(using=using):
+            # the nested plain atomic blocks of other code keep their own mode
+            connection.begin_immediate = previous
+            yield
+    finally:
+        connection.begin_immediate = previous
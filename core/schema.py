@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import django
+import drf_yasg
+import rest_framework
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views import View
+from drf_yasg import openapi
+from drf_yasg.app_settings import swagger_settings
+from drf_yasg.codecs import OpenAPICodecJson, yaml_sane_dump
+from drf_yasg.renderers import ReDocRenderer, SwaggerUIRenderer
+from rest_framework.request import Request
+
+API_INFO = openapi.Info(
+    title="Links storage (X_One test task)",
+    default_version='v1',
+    description="API for storing and distributing to collections of custom links. When adding a link to the system,"
+                " the system generates a title, description, link type and so on for user convenience.",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@snippets.local"),
+    license=openapi.License(name="BSD License"),
+)
+
+# the spec of a given version never changes, its url carries the version
+VERSIONED_MAX_AGE = 365 * 24 * 60 * 60
+# the packages whose urls, views and serializers make the schema
+SCHEMA_SOURCES = ('core', 'links', 'users')
+
+
+def generate_schema():
+    """
+    The public schema of every endpoint as JSON bytes, the only place the views are introspected.
+    The views see an anonymous request, the empty url leaves the host and scheme to the client
+    """
+    generator = swagger_settings.DEFAULT_GENERATOR_CLASS(API_INFO, url='')
+    request = Request(RequestFactory().get(reverse('schema-json', kwargs={'format': '.json'})))
+    request.user = AnonymousUser()
+    return OpenAPICodecJson(validators=[]).encode(generator.get_schema(request=request, public=True))
+
+
+def write_schema(path):
+    """
+    Writing the generated schema atomically along with the code version it was generated from, returns its version
+    """
+    content = generate_schema()
+    _write_atomically(path, content)
+    _write_atomically(f'{path}.code', code_version().encode())
+    return schema_version(content)
+
+
+def read_schema(path):
+    """
+    The schema written by write_schema, None when it is missing or was generated from other code
+    """
+    try:
+        with open(f'{path}.code', 'rb') as file:
+            if file.read().decode() != code_version():
+                return None
+        with open(path, 'rb') as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+
+def code_version():
+    """
+    Hash of the project sources and of the library versions the schema is generated with
+    """
+    digest = hashlib.sha256(f'{django.__version__} {rest_framework.VERSION} {drf_yasg.__version__}'.encode())
+    for package in SCHEMA_SOURCES:
+        for path in sorted(Path(settings.BASE_DIR, package).rglob('*.py')):
+            digest.update(path.relative_to(settings.BASE_DIR).as_posix().encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def _write_atomically(path, content):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as file:
+        file.write(content)
+    os.replace(temp_path, path)
+
+
+def schema_version(content):
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+class VersionedSpecSwaggerUIRenderer(SwaggerUIRenderer):
+    spec_url = None
+
+    def get_swagger_ui_settings(self):
+        return {**super().get_swagger_ui_settings(), 'url': self.spec_url}
+
+
+class VersionedSpecReDocRenderer(ReDocRenderer):
+    spec_url = None
+
+    def get_redoc_settings(self):
+        return {**super().get_redoc_settings(), 'url': self.spec_url}
+
+
+class SchemaDocuments:
+    """
+    The spec and the documentation pages rendered once per process from API_SCHEMA_FILE,
+    which is written on deploy by `python manage.py links_generate_schema`. Without the file,
+    or when it was written for other code, the schema is generated on the first load
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documents = None
+        self.version = None
+
+    def get(self, name):
+        if self._documents is None:
+            self.load()
+        return self._documents[name]
+
+    def load(self):
+        with self._lock:
+            if self._documents is not None:
+                return
+            content = read_schema(settings.API_SCHEMA_FILE)
+            if content is None:
+                content = generate_schema()
+            version = schema_version(content)
+            spec = json.loads(content, object_pairs_hook=OrderedDict)
+            spec_url = f'{reverse("schema-json", kwargs={"format": ".json"})}?v={version}'
+            self._documents = {
+                'json': ('application/json', content),
+                'openapi': ('application/openapi+json', content),
+                'yaml': ('application/yaml', yaml_sane_dump(spec, binary=True)),
+                'swagger': ('text/html; charset=utf-8', self._page(VersionedSpecSwaggerUIRenderer, spec, spec_url)),
+                'redoc': ('text/html; charset=utf-8', self._page(VersionedSpecReDocRenderer, spec, spec_url)),
+            }
+            self.version = version
+
+    @staticmethod
+    def _page(renderer_class, spec, spec_url):
+        # the pages only show the title and version of the schema and load the spec from spec_url,
+        # without USE_SESSION_AUTH they are the same for every visitor
+        info = openapi.Info(title=spec['info']['title'], default_version=spec['info']['version'])
+        renderer = renderer_class()
+        renderer.spec_url = spec_url
+        swagger = openapi.Swagger(info=info, _prefix='/', paths=openapi.Paths({}))
+        return renderer.render(swagger, renderer_context={'request': None}).encode()
+
+
+schema_documents = SchemaDocuments()
+
+
+class SchemaView(View):
+    """
+    Serving the precomputed schema and documentation pages with an ETag of the schema version.
+    The spec requested with its current version is cached for a year, the rest for API_SCHEMA_MAX_AGE
+    """
+    document = 'swagger'
+
+    def get(self, request, format=None):
+        name = format.lstrip('.') if format else request.GET.get('format', self.document)
+        # the spec is also served by the pages for ?format=openapi like the drf_yasg views did
+        if name not in ('json', 'yaml', 'openapi') and (format or name != self.document):
+            raise Http404(f'Unknown schema format {name}')
+
+        content_type, content = schema_documents.get(name)
+        etag = f'"{schema_documents.version}-{name}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        if request.GET.get('v') == schema_documents.version:
+            patch_cache_control(response, public=True, max_age=VERSIONED_MAX_AGE, immutable=True)
+        else:
+            patch_cache_control(response, public=True, max_age=settings.API_SCHEMA_MAX_AGE)
+        return response
@@ -34,6 +34,7 @@ INSTALLED_APPS = [
 
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'djoser',
     'drf_yasg',
 
@@ -77,8 +78,10 @@ WSGI_APPLICATION = 'core.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=10 * 60),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -131,8 +134,7 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         # 'rest_framework.authentication.BasicAuthentication',
         # 'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.RevocableJWTAuthentication',
 
     ],
     'DEFAULT_RENDERER_CLASSES': [
@@ -220,3 +222,124 @@ EMAIL_ADMIN = EMAIL_HOST_USER
 
 SERVER_EMAIL = EMAIL_HOST_USER
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+# Links ingestion
+# With LINKS_ASYNC_INGESTION the link is stored as pending and its metadata is
+# fetched by the `python manage.py links_worker` pool
+
+LINKS_ASYNC_INGESTION = env.bool('LINKS_ASYNC_INGESTION', default=False)
+LINKS_INGEST_WORKERS = env.int('LINKS_INGEST_WORKERS', default=4)
+LINKS_INGEST_POLL_INTERVAL = 1.0
+LINKS_INGEST_STALE_AFTER = 600
+
+# Fetching of the link pages and pictures through the shared pooled session
+
+LINKS_FETCH_CONNECT_TIMEOUT = 5
+LINKS_FETCH_READ_TIMEOUT = 15
+LINKS_FETCH_MAX_HEAD_BYTES = 512 * 1024
+LINKS_FETCH_MAX_IMAGE_BYTES = 10 * 1024 * 1024
+LINKS_FETCH_POOL_HOSTS = 64
+LINKS_FETCH_POOL_SIZE = 16
+
+# Page metadata cache shared between users, see links/links_metadata_cache.py. The hits are counted in the process,
+# last_used and the hit count of an entry are written at most once per LINKS_METADATA_CACHE_TOUCH_INTERVAL seconds
+
+LINKS_METADATA_CACHE_TTL = 24 * 60 * 60
+LINKS_METADATA_CACHE_MAX_ENTRIES = 100000
+LINKS_METADATA_CACHE_FETCH_WAIT = 30
+LINKS_METADATA_CACHE_TOUCH_INTERVAL = LINKS_METADATA_CACHE_TTL // 10
+
+# Processes rendering the link picture thumbnails, 0 renders them in the calling process
+
+LINKS_THUMBNAIL_PROCESSES = env.int('LINKS_THUMBNAIL_PROCESSES', default=2)
+
+# Bulk import of links, see links/links_bulk_import.py. Without LINKS_ASYNC_INGESTION the pages are downloaded
+# within the request, so at most LINKS_BULK_MAX_SYNC_URLS urls are accepted to stay within the proxy timeouts
+
+LINKS_BULK_MAX_URLS = 10000
+LINKS_BULK_MAX_SYNC_URLS = 100
+LINKS_BULK_CONCURRENCY = 32
+LINKS_BULK_PER_HOST_CONCURRENCY = 4
+
+# Shortener link targets are followed once and kept for this many seconds
+
+LINKS_RESOLVED_URL_TTL = 30 * 24 * 60 * 60
+
+# Serializing the list and retrieve responses straight from values() rows, see links/links_fast_serializers.py
+
+LINKS_FAST_SERIALIZATION = env.bool('LINKS_FAST_SERIALIZATION', default=True)
+
+# Links added to or removed from a collection in one request
+
+LINKS_COLLECTION_MAX_LINKS = 10000
+
+# Number of users in the top users report by default and at most, see links/links_report.py
+
+LINKS_REPORT_LIMIT = 10
+LINKS_REPORT_MAX_LIMIT = 1000
+
+# Per user cache of the links and collections read responses, see links/links_response_cache.py.
+# A file cache by default, so that the server processes and the links worker share the invalidations,
+# redis://host:port/db (needs the redis package) on several hosts, locmemcache:// for a single process
+# and dummycache:// to turn it off. The file and local memory caches cull a third of their entries on a write
+# above MAX_ENTRIES, the Django default of 300 would cull all the time, ?max_entries= in the url changes it
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'responses': env.cache('LINKS_RESPONSE_CACHE_URL', default=f'filecache://{BASE_DIR / "cache" / "responses"}'),
+}
+if CACHES['responses']['BACKEND'].rsplit('.', 1)[-1] in ('FileBasedCache', 'LocMemCache'):
+    CACHES['responses'].setdefault('OPTIONS', {}).setdefault('MAX_ENTRIES', 50_000)
+LINKS_RESPONSE_CACHE = 'responses'
+LINKS_RESPONSE_CACHE_TIMEOUT = 5 * 60
+
+# Hit and miss counters of the caches summed over the processes, see links/links_counters.py.
+# A process adds its counts to the LINKS_COUNTERS_CACHE cache at most once per LINKS_COUNTERS_FLUSH_INTERVAL seconds
+
+LINKS_COUNTERS_CACHE = 'responses'
+LINKS_COUNTERS_FLUSH_INTERVAL = 10
+
+# Active state of the users checked by users.authentication.StatelessJWTAuthentication, a deactivated
+# user keeps access for at most this many seconds in the processes that did not deactivate it
+
+USERS_STATE_CACHE_TTL = 60
+USERS_STATE_CACHE_MAX_ENTRIES = 10000
+
+# Revoked access tokens, see users/token_revocation.py. The Bloom filter snapshot is shared by the processes
+# through the file, which is checked for changes every USERS_REVOCATION_CHECK_INTERVAL seconds. A revocation
+# rewrites it, `python manage.py users_rebuild_revocation_filter` writes the first one and drops the expired tokens
+
+USERS_REVOCATION_SNAPSHOT = BASE_DIR / 'cache' / 'revoked_tokens.bloom'
+USERS_REVOCATION_ERROR_RATE = 0.001
+USERS_REVOCATION_CHECK_INTERVAL = 1
+
+# Native async views of the links list, retrieve and create, see links/async_views.py. Turned on by core.asgi,
+# so the routes stay with the sync viewset under WSGI. The pages and pictures of the async views are fetched
+# through one httpx client per process with at most LINKS_ASYNC_FETCH_MAX_CONNECTIONS open connections
+
+LINKS_ASYNC_VIEWS = env.bool('LINKS_ASYNC_VIEWS', default=False)
+LINKS_ASYNC_FETCH_MAX_CONNECTIONS = 512
+
+# OpenAPI schema served from memory by core.schema.SchemaView. The file is written on deploy by
+# `python manage.py links_generate_schema` with a hash of the code next to it, without it or after a code change
+# every process generates the schema when it starts.
+# The pages and the unversioned spec urls are cached by clients for API_SCHEMA_MAX_AGE seconds
+
+API_SCHEMA_FILE = BASE_DIR / 'cache' / 'openapi.json'
+API_SCHEMA_MAX_AGE = 10 * 60
+
+# SQLite tuning of the core.sqlite3 backend, the pragmas run on every new connection. WAL mode is turned on
+# by SQLITE_WAL in the deployment (docker-compose.yml), it is stored in the database file and leaves -wal and -shm
+# files next to it. In WAL mode the readers are not blocked by the link writes, and synchronous=NORMAL only syncs
+# at checkpoints, a power loss can drop the last commits but not corrupt the database. A writer waits up to
+# busy_timeout milliseconds for the write lock, the transactions of core.db.write_atomic take it when they start.
+# mmap_size is in bytes, a negative cache_size in KiB. The connections are kept for DB_CONN_MAX_AGE seconds,
+# core.asgi turns that off as every ASGI request runs on its own thread
+
+SQLITE_WAL = env.bool('SQLITE_WAL', default=False)
+SQLITE_PRAGMAS = {
+    **({'journal_mode': 'wal', 'synchronous': 'normal'} if SQLITE_WAL else {}),
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+}
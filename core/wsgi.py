@@ -5,3 +5,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+from core.schema import schema_documents  # noqa: E402
+
+# the OpenAPI schema and the documentation pages are prepared before the first request
+schema_documents.load()
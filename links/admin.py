@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import UserLink, UserLinkCollection
+from .models import UserLink, UserLinkCollection, LinkIngestJob, LinkMetadata, LinkImage, ResolvedUrl, UserLinkTypeCount, UserLinkTotal
 
 
 class UserLinkAdmin(admin.ModelAdmin):
@@ -10,8 +10,8 @@ class UserLinkAdmin(admin.ModelAdmin):
     class Meta:
         model = UserLink
 
-    list_display = ['user', 'title', 'link_type', 'description'] + ['id']
-    list_filter = ['user', 'link_type']
+    list_display = ['user', 'title', 'link_type', 'description', 'status'] + ['id']
+    list_filter = ['user', 'link_type', 'status']
 
 
 class UserLinkCollectionAdmin(admin.ModelAdmin):
@@ -25,5 +25,83 @@ class UserLinkCollectionAdmin(admin.ModelAdmin):
     list_filter = ['user']
 
 
+class LinkIngestJobAdmin(admin.ModelAdmin):
+    """
+    Link ingestion job model view in admin panel
+    """
+    class Meta:
+        model = LinkIngestJob
+
+    list_display = ['link', 'status', 'attempts', 'creation_date', 'finished_at'] + ['id']
+    list_filter = ['status']
+    raw_id_fields = ['link']
+
+
+class LinkMetadataAdmin(admin.ModelAdmin):
+    """
+    Shared link metadata cache view in admin panel
+    """
+    class Meta:
+        model = LinkMetadata
+
+    list_display = ['url', 'title', 'link_type', 'hits', 'fetched_at', 'last_used'] + ['id']
+    search_fields = ['url']
+
+
+class LinkImageAdmin(admin.ModelAdmin):
+    """
+    Content-addressed link pictures view in admin panel
+    """
+    class Meta:
+        model = LinkImage
+
+    list_display = ['name', 'size', 'ref_count', 'creation_date', 'released_at'] + ['id']
+    search_fields = ['sha256', 'name']
+
+
+class ResolvedUrlAdmin(admin.ModelAdmin):
+    """
+    Shortener link targets view in admin panel
+    """
+    class Meta:
+        model = ResolvedUrl
+
+    list_display = ['source', 'target', 'resolved_at'] + ['id']
+    search_fields = ['source', 'target']
+
+
+class UserLinkTypeCountAdmin(admin.ModelAdmin):
+    """
+    Per user link type counters view in admin panel
+    """
+    class Meta:
+        model = UserLinkTypeCount
+
+    list_display = ['user', 'link_type', 'count'] + ['id']
+    list_filter = ['link_type']
+    raw_id_fields = ['user']
+
+
+class UserLinkTotalAdmin(admin.ModelAdmin):
+    """
+    Top users report view in admin panel, see the links_refresh_report command
+    """
+    class Meta:
+        model = UserLinkTotal
+
+    list_display = ['user', 'total', 'date_joined']
+    ordering = ['-total', 'date_joined', 'user']
+    list_select_related = ['user']
+    search_fields = ['user__email']
+    show_full_result_count = False
+    raw_id_fields = ['user']
+
+
 admin.site.register(UserLink, UserLinkAdmin)
 admin.site.register(UserLinkCollection, UserLinkCollectionAdmin)
+admin.site.register(LinkIngestJob, LinkIngestJobAdmin)
+admin.site.register(LinkMetadata, LinkMetadataAdmin)
+admin.site.register(LinkImage, LinkImageAdmin)
+admin.site.register(ResolvedUrl, ResolvedUrlAdmin)
+admin.site.register(UserLinkTypeCount, UserLinkTypeCountAdmin)
+admin.site.register(UserLinkTotal, UserLinkTotalAdmin)
@@ -0,0 +1,171 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from links.links_async_ingest import canonicalize_url, create_link, get_link_metadata, link_exists
+from links.links_conditional import achange_stamp, aconditional_response
+from links.links_fast_serializers import ValuesSerializer
+from links.links_ingest_utils import DUPLICATE_LINK_MESSAGE
+from links.links_response_cache import cache_response, get_cached_response
+from links.models import UserLink
+from links.views import UserLinkAPIViewSet
+
+# the requests the async views do not serve: the other methods, the browsable API,
+# the pending links of LINKS_ASYNC_INGESTION and the model serializer path
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+links_list_view = UserLinkAPIViewSet.as_view(LIST_ACTIONS, basename='links', detail=False, suffix='List')
+links_detail_view = UserLinkAPIViewSet.as_view(DETAIL_ACTIONS, basename='links', detail=True, suffix='Instance')
+
+
+def init_viewset(request, actions, detail, **kwargs):
+    """
+    UserLinkAPIViewSet set up for the request the way its as_view and dispatch do it, the viewset provides
+    the authentication, permissions, content negotiation, filters, pagination and serializer of the async views
+    """
+    view = UserLinkAPIViewSet(basename='links', detail=detail, action_map=actions, args=(), kwargs=kwargs)
+    for method, action in {'head': actions['get'], **actions}.items():
+        setattr(view, method, getattr(view, action))
+    view.format_kwarg = view.get_format_suffix(**kwargs)
+    view.request = view.initialize_request(request, **kwargs)
+    view.headers = view.default_response_headers
+    return view
+
+
+def rendered(view, response, **kwargs):
+    """
+    Plain HttpResponse of the rendered response, so that the handler does not render it on the sync thread
+    """
+    if not isinstance(response, Response):
+        return response
+    response = view.finalize_response(view.request, response, **kwargs)
+    response.render()
+    plain = HttpResponse(response.content, status=response.status_code)
+    for name, value in response.items():
+        plain[name] = value
+    return plain
+
+
+def start(view, cached, **kwargs):
+    """
+    The sync work ahead of the handler in a single hop to the thread of the request: authentication,
+    permissions and, for the cached actions, the cached response. The token user needs no query
+    unless its active state has expired
+    """
+    view.initial(view.request, **kwargs)
+    if cached:
+        return get_cached_response(view.request, f'{view.basename}-{view.action}')
+    return None
+
+
+async def serve(view, handler, fallback, cached=False, **kwargs):
+    request = view.request
+    try:
+        renderer = view.perform_content_negotiation(request)[0]
+    except APIException:
+        renderer = None
+    if renderer is None or renderer.format != 'json' or not settings.LINKS_FAST_SERIALIZATION:
+        return await sync_to_async(fallback)(request._request, **kwargs)
+
+    try:
+        response = await sync_to_async(start)(view, cached, **kwargs)
+        if response is None:
+            response = rendered(view, await handler(view, **kwargs), **kwargs)
+            if cached and response.status_code == 200:
+                # CachedResponseViewMixin.cached of the async views
+                await sync_to_async(cache_response)(request, response)
+    except Exception as exc:
+        response = view.handle_exception(exc)
+    return rendered(view, response, **kwargs)
+
+
+async def list_links(view):
+    request = view.request
+    queryset = view.filter_queryset(view.get_queryset())
+
+    async def respond():
+        serializer = ValuesSerializer(view.get_serializer())
+        # the pagination key is read from the rows to build the cursors
+        ordering = view.paginator.get_ordering(request, queryset, view)[0].lstrip('-')
+        page = await view.paginator.apaginate_queryset(serializer.values(queryset, ordering), request, view)
+        return view.get_paginated_response(serializer.serialize(page))
+
+    stamps = (await achange_stamp(queryset),)
+    return await aconditional_response(request, stamps, respond, use_last_modified=False)
+
+
+async def retrieve_link(view, pk):
+    request = view.request
+    not_found = Http404(f'No {UserLink._meta.object_name} matches the given query.')
+    try:
+        queryset = view.filter_queryset(view.get_queryset()).filter(pk=pk)
+    except (TypeError, ValueError, DjangoValidationError):
+        raise not_found
+
+    async def respond():
+        serializer = ValuesSerializer(view.get_serializer())
+        row = await serializer.values(queryset).afirst()
+        if row is None:
+            raise not_found
+        return Response(serializer.serialize([row])[0])
+
+    stamps = (await achange_stamp(queryset),)
+    if not stamps[0][1]:
+        raise not_found
+    return await aconditional_response(request, stamps, respond, use_last_modified=True)
+
+
+async def create_user_link(view):
+    """
+    UserLinkAPIViewSet.create with the page, its picture and the shortener redirects fetched on the event loop,
+    the request holds no thread while it waits on the remote site
+    """
+    request = view.request
+    data = {'user_id': request.user.id}
+    link = await canonicalize_url(request.data['link'])
+    if await link_exists(data['user_id'], link):
+        return Response(DUPLICATE_LINK_MESSAGE)
+    metadata = await get_link_metadata(link)
+
+    if await link_exists(data['user_id'], metadata['url']):
+        return Response(DUPLICATE_LINK_MESSAGE)
+    try:
+        await create_link(data['user_id'], metadata)
+    except IntegrityError:
+        return Response(DUPLICATE_LINK_MESSAGE)
+    data.update(
+        title=metadata['title'],
+        description=metadata['description'],
+        url=metadata['url'],
+        link_type=metadata['link_type'],
+        image=metadata['image_url'],
+    )
+    return Response(data)
+
+
+@csrf_exempt
+async def links_list(request):
+    """
+    GET and POST of /api/links/ under ASGI
+    """
+    if request.method == 'GET':
+        return await serve(init_viewset(request, LIST_ACTIONS, detail=False), list_links, links_list_view, cached=True)
+    if request.method == 'POST' and not settings.LINKS_ASYNC_INGESTION:
+        return await serve(init_viewset(request, LIST_ACTIONS, detail=False), create_user_link, links_list_view)
+    return await sync_to_async(links_list_view)(request)
+
+
+@csrf_exempt
+async def links_detail(request, pk):
+    """
+    GET of /api/links/<id>/ under ASGI
+    """
+    if request.method == 'GET':
+        view = init_viewset(request, DETAIL_ACTIONS, detail=True, pk=pk)
+        return await serve(view, retrieve_link, links_detail_view, cached=True, pk=pk)
+    return await sync_to_async(links_detail_view)(request, pk=pk)
@@ -0,0 +1,58 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from links.links_url_utils import url_host
+from links.serializers import split_fields
+
+# query parameter: (lookup, whether a bare date means the end of the day)
+DATE_FILTERS = {
+    'created_after': ('creation_date__gte', False),
+    'created_before': ('creation_date__lt', True),
+    'changed_after': ('change_date__gte', False),
+    'changed_before': ('change_date__lt', True),
+}
+
+
+def parse_date_param(name, value, end_of_day):
+    """
+    Aware datetime of an ISO 8601 date or datetime, a bare date is the start of the day
+    or of the next day for the upper bounds
+    """
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError
+            moment = datetime.combine(day + timedelta(days=end_of_day), time())
+    except ValueError:
+        raise ValidationError({name: ['Expected an ISO 8601 date or datetime']})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class UserLinkFilterBackend(BaseFilterBackend):
+    """
+    Filtering the links by ?link_type=, ?host= and the creation and change date ranges.
+    Every filter is served by one of the (user, ..., date, id) indexes of UserLink
+    """
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        link_types = split_fields(params.get('link_type', ''))
+        if len(link_types) == 1:
+            queryset = queryset.filter(link_type=link_types[0])
+        elif link_types:
+            queryset = queryset.filter(link_type__in=link_types)
+        host = params.get('host', '').strip()
+        if host:
+            # a bare host or a whole url
+            queryset = queryset.filter(host=url_host(host if '://' in host else f'//{host}'))
+        for name, (lookup, end_of_day) in DATE_FILTERS.items():
+            if params.get(name):
+                queryset = queryset.filter(**{lookup: parse_date_param(name, params[name], end_of_day)})
+        return queryset
@@ -0,0 +1,20 @@
+import asyncio
+import weakref
+
+from asgiref.sync import sync_to_async
+
+_write_locks = weakref.WeakKeyDictionary()
+
+
+async def write(func, *args, **kwargs):
+    """
+    Running a sync function that writes to the database, one at a time per event loop. Every ASGI request
+    runs its sync code in its own thread with its own connection, and SQLite fails a transaction that reads
+    before it writes at once with "database is locked" while another connection writes, instead of waiting
+    """
+    loop = asyncio.get_running_loop()
+    lock = _write_locks.get(loop)
+    if lock is None:
+        lock = _write_locks[loop] = asyncio.Lock()
+    async with lock:
+        return await sync_to_async(func)(*args, **kwargs)
@@ -0,0 +1,96 @@
+import asyncio
+import weakref
+from http.cookiejar import CookieJar
+
+import httpx
+from django.conf import settings
+
+from links.links_create_utils import cookies, headers
+from links.links_head_parser import HeadMetaReader
+from links.links_http_client import CHUNK_SIZE, RejectCookiePolicy, ResponseTooLarge
+
+# one client per event loop, a client cannot be used from another loop
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """
+    AsyncClient of the running event loop, its connection pool stays alive across requests of the process.
+    Same headers, cookies, timeouts and pool limits as the shared session of links_http_client
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = httpx.AsyncClient(
+            headers={**headers, 'cookie': '; '.join(f'{name}={value}' for name, value in cookies.items())},
+            # the cookies set by fetched sites are not sent to the next ones
+            cookies=httpx.Cookies(CookieJar(policy=RejectCookiePolicy())),
+            timeout=httpx.Timeout(settings.LINKS_FETCH_READ_TIMEOUT, connect=settings.LINKS_FETCH_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.LINKS_ASYNC_FETCH_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LINKS_FETCH_POOL_HOSTS,
+            ),
+            follow_redirects=True,
+        )
+    return client
+
+
+async def close_client():
+    """
+    Closing the client of the running event loop, for loops that end with their work like asyncio.run
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def extract_page_meta(url):
+    """
+    Streaming the page and reading its meta tags, the download stops at </head> or LINKS_FETCH_MAX_HEAD_BYTES.
+    Returns the meta tags and the final url of the page after redirects,
+    httpx.HTTPStatusError is raised for an error page so that its metadata is not cached
+    """
+    async with get_client().stream('GET', url) as response:
+        response.raise_for_status()
+        reader = HeadMetaReader(settings.LINKS_FETCH_MAX_HEAD_BYTES, declared_encoding=response.charset_encoding)
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            if reader.feed(chunk):
+                break
+        return reader.close(), str(response.url)
+
+
+async def resolve_redirects(url):
+    """
+    Final url after following the redirects of the url, the body is not downloaded
+    """
+    response = await get_client().head(url)
+    if response.status_code == 405:
+        # some shorteners only redirect GET requests
+        async with get_client().stream('GET', url) as response:
+            pass
+    return str(response.url)
+
+
+async def fetch(url, max_bytes):
+    """
+    Downloading the body of the url with timeouts and a size cap, ResponseTooLarge is raised for bodies over max_bytes
+    """
+    async with get_client().stream('GET', url) as response:
+        response.raise_for_status()
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise ResponseTooLarge(f'{response.url} is {length} bytes, the limit is {max_bytes}')
+
+        body = bytearray()
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            body += chunk
+            if len(body) > max_bytes:
+                raise ResponseTooLarge(f'{response.url} is over the limit of {max_bytes} bytes')
+        return bytes(body)
+
+
+async def fetch_image(url):
+    """
+    Downloading the picture, pictures over LINKS_FETCH_MAX_IMAGE_BYTES are rejected
+    """
+    return await fetch(url, settings.LINKS_FETCH_MAX_IMAGE_BYTES)
@@ -0,0 +1,67 @@
+from asgiref.sync import sync_to_async
+
+from links import links_ingest_utils
+from links.links_async_db import write
+from links.links_async_http_client import extract_page_meta, fetch_image, resolve_redirects
+from links.links_image_store import register_image, write_image_files
+from links.links_ingest_utils import DEFAULT_IMAGE, DEFAULT_IMAGE_URL, link_data
+from links.links_metadata_cache import metadata_cache
+from links.links_url_resolver import cached_targets, remember_targets
+from links.links_url_utils import clean_url, is_shortener, url_hash
+from links.models import UserLink
+
+
+async def canonicalize_url(url):
+    """
+    links_url_resolver.canonicalize_url with the redirects of an unknown shortener followed on the event loop
+    """
+    url = clean_url(url)
+    if not is_shortener(url):
+        return url
+    target = (await sync_to_async(cached_targets)([url])).get(url)
+    if target is None:
+        target = clean_url(await resolve_redirects(url))
+        await write(remember_targets, {url: target})
+    return target
+
+
+async def download_link(link):
+    """
+    Fetching the page metadata and the picture bytes without touching the database,
+    the picture is None for pages without og:image
+    """
+    data = link_data(link, *await extract_page_meta(link))
+    content = None if data['image'] == DEFAULT_IMAGE_URL else await fetch_image(data['image'])
+    return data, content
+
+
+async def store_downloaded_link(data, content):
+    """
+    links_ingest_utils.store_downloaded_link with the pictures rendered outside the write lock
+    """
+    data['image_url'] = data['image']
+    if content is None:
+        data['image'] = DEFAULT_IMAGE
+    else:
+        data['image'] = await write(register_image, *await sync_to_async(write_image_files)(content))
+    return data
+
+
+async def fetch_link_metadata(link):
+    return await store_downloaded_link(*await download_link(link))
+
+
+async def get_link_metadata(link):
+    """
+    Link metadata from the shared cache, the page is only fetched on a cache miss.
+    The link is expected in its canonical form, see canonicalize_url
+    """
+    return await metadata_cache.aget_or_fetch(link, fetch_link_metadata)
+
+
+async def create_link(user_id, metadata):
+    return await write(links_ingest_utils.create_link, user_id, metadata)
+
+
+async def link_exists(user_id, url):
+    return await UserLink.objects.filter(user_id=user_id, url_hash=url_hash(url)).aexists()
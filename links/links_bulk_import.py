@@ -0,0 +1,263 @@
+import asyncio
+from collections import Counter, defaultdict
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from core.db import write_atomic
+from links.links_async_http_client import close_client
+from links.links_async_ingest import download_link
+from links.links_image_store import acquire_images
+from links.links_ingest_utils import store_downloaded_link
+from links.links_metadata_cache import metadata_cache
+from links.links_response_cache import bump_user_version
+from links.links_stats import count_links, record_link_changes
+from links.links_url_resolver import canonicalize_urls, remember_targets
+from links.links_url_utils import is_shortener, url_hash, url_host
+from links.models import LinkIngestJob, UserLink
+
+RESULT_CREATED = 'created'
+RESULT_PENDING = 'pending'
+RESULT_DUPLICATE = 'duplicate'
+RESULT_INVALID = 'invalid'
+RESULT_FAILED = 'failed'
+
+
+class BookmarksParser(HTMLParser):
+    """
+    Collecting the urls of a Netscape bookmarks file exported by browsers
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.urls = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.urls.append(href)
+
+
+def parse_bookmarks(content):
+    parser = BookmarksParser()
+    parser.feed(content)
+    parser.close()
+    return parser.urls
+
+
+def split_urls(urls):
+    """
+    Unique http(s) urls in the submitted order and the rejected ones
+    """
+    valid, invalid, seen = [], [], set()
+    for url in urls:
+        url = str(url).strip()
+        if url in seen:
+            continue
+        seen.add(url)
+        parts = urlsplit(url)
+        if parts.scheme in ('http', 'https') and parts.hostname:
+            valid.append(url)
+        else:
+            invalid.append(url)
+    return valid, invalid
+
+
+async def _fetch_all(urls, concurrency, per_host):
+    limit = asyncio.Semaphore(concurrency)
+    host_limits = defaultdict(lambda: asyncio.Semaphore(per_host))
+
+    async def fetch_one(url):
+        async with host_limits[urlsplit(url).hostname], limit:
+            return await download_link(url)
+
+    try:
+        results = await asyncio.gather(*(fetch_one(url) for url in urls), return_exceptions=True)
+    finally:
+        # the client of the loop cannot be used once asyncio.run returns
+        await close_client()
+    return dict(zip(urls, results))
+
+
+def download_concurrently(urls):
+    """
+    Pages and pictures of the urls downloaded concurrently on an event loop with the async http client,
+    at most LINKS_BULK_CONCURRENCY downloads in total and LINKS_BULK_PER_HOST_CONCURRENCY per host.
+    Failed urls map to their exception
+    """
+    return asyncio.run(_fetch_all(urls, settings.LINKS_BULK_CONCURRENCY, settings.LINKS_BULK_PER_HOST_CONCURRENCY))
+
+
+def get_metadata_in_bulk(urls):
+    """
+    Link metadata of every url: cached entries are read in one query, the rest is downloaded concurrently.
+    The urls being fetched by other requests are waited for through the metadata cache.
+    The database is only used from the calling thread, the event loop of the downloads stays off it
+    """
+    targets = {}
+
+    def fetch_many(missing):
+        metadata = {}
+        for url, downloaded in download_concurrently(missing).items():
+            if isinstance(downloaded, BaseException):
+                metadata[url] = downloaded
+                continue
+            try:
+                metadata[url] = store_downloaded_link(*downloaded)
+            except Exception as e:
+                metadata[url] = e
+                continue
+            if is_shortener(url):
+                targets[url] = metadata[url]['url']
+        return metadata
+
+    metadata = metadata_cache.get_or_fetch_many(urls, fetch_many)
+    # the shortener redirects were followed by the downloads, their targets are kept for next time
+    remember_targets(targets)
+    return metadata
+
+
+def import_links(user_id, urls):
+    """
+    Adding the urls to the user links, returns a result for every submitted url
+    """
+    valid, invalid = split_urls(urls)
+    results = {url: {'url': url, 'status': RESULT_INVALID} for url in invalid}
+
+    canonical = canonicalize_urls(valid)
+    existing = existing_hashes(user_id, canonical.values())
+    new_urls = {}
+    for url in valid:
+        link_hash = url_hash(canonical[url])
+        if link_hash in existing:
+            results[url] = {'url': url, 'status': RESULT_DUPLICATE}
+        else:
+            existing.add(link_hash)
+            new_urls[url] = canonical[url]
+
+    if settings.LINKS_ASYNC_INGESTION:
+        created = enqueue_links(user_id, new_urls, results)
+        for url, link in created.items():
+            results[url] = {'url': url, 'status': RESULT_PENDING, 'id': link.id}
+    else:
+        created = create_links(user_id, new_urls, results)
+        for url, link in created.items():
+            results[url] = {'url': url, 'status': RESULT_CREATED, 'id': link.id}
+
+    return [results[url] for url in dict.fromkeys(str(url).strip() for url in urls)]
+
+
+def create_links(user_id, urls, results):
+    """
+    Fetching the metadata of the urls and inserting the links in bulk, urls maps the submitted urls
+    to their canonical ones. Failures and duplicates of the resolved urls are written to results
+    """
+    metadata = get_metadata_in_bulk(list(urls.values()))
+
+    resolved = [data['url'] for data in metadata.values() if not isinstance(data, BaseException)]
+    existing = existing_hashes(user_id, resolved)
+
+    links = {}
+    for url, canonical in urls.items():
+        data = metadata[canonical]
+        if isinstance(data, BaseException):
+            results[url] = {'url': url, 'status': RESULT_FAILED, 'error': str(data) or data.__class__.__name__}
+            continue
+        link_hash = url_hash(data['url'])
+        if link_hash in existing:
+            results[url] = {'url': url, 'status': RESULT_DUPLICATE}
+            continue
+        existing.add(link_hash)
+        now = timezone.now()
+        links[url] = UserLink(
+            user_id=user_id,
+            title=data['title'][:100],
+            description=data['description'][:1000],
+            url=data['url'],
+            url_hash=link_hash,
+            host=url_host(data['url']),
+            link_type=data['link_type'],
+            image=data['image'],
+            creation_date=now,
+            change_date=now,
+        )
+
+    insert_new_links(user_id, links, results, insert_links)
+    return links
+
+
+def insert_new_links(user_id, links, results, insert):
+    """
+    Calling insert(links) for the links that are not in the database yet. The urls added concurrently
+    make the (user, url_hash) constraint fail, they are reported as duplicates and the rest is inserted again
+    until no conflict remains
+    """
+    while links:
+        try:
+            insert(links)
+            return
+        except IntegrityError:
+            existing = existing_hashes(user_id, [link.url for link in links.values()])
+            if not any(link.url_hash in existing for link in links.values()):
+                raise
+            for url, link in list(links.items()):
+                # the ids of the rolled back batches are not kept
+                link.pk = None
+                if link.url_hash in existing:
+                    results[url] = {'url': url, 'status': RESULT_DUPLICATE}
+                    del links[url]
+
+
+def insert_links(links):
+    with write_atomic():
+        UserLink.objects.bulk_create(links.values())
+        # bulk_create sends no signals, the picture references and the link types are counted
+        # and the cached responses invalidated here
+        acquire_images(Counter(link.image.name for link in links.values()))
+        record_link_changes(count_links(links.values()))
+        for user_id in {link.user_id for link in links.values()}:
+            bump_user_version(user_id)
+
+
+def existing_hashes(user_id, urls):
+    """
+    Hashes of the urls the user already has, one query on the (user, url_hash) index
+    """
+    hashes = {url_hash(url) for url in urls}
+    return set(UserLink.objects.filter(user_id=user_id, url_hash__in=hashes).values_list('url_hash', flat=True))
+
+
+def enqueue_links(user_id, urls, results):
+    """
+    Inserting the urls as pending links with their ingestion jobs in bulk,
+    urls maps the submitted urls to their canonical ones. Duplicates added concurrently are written to results
+    """
+    now = timezone.now()
+    links = {
+        url: UserLink(
+            user_id=user_id,
+            title=canonical[:100],
+            description='',
+            url=canonical,
+            url_hash=url_hash(canonical),
+            host=url_host(canonical),
+            status=UserLink.STATUS_PENDING,
+            creation_date=now,
+            change_date=now,
+        )
+        for url, canonical in urls.items()
+    }
+    insert_new_links(user_id, links, results, insert_pending_links)
+    return links
+
+
+def insert_pending_links(links):
+    with write_atomic():
+        UserLink.objects.bulk_create(links.values())
+        LinkIngestJob.objects.bulk_create(LinkIngestJob(link=link) for link in links.values())
+        record_link_changes(count_links(links.values()))
+        for user_id in {link.user_id for link in links.values()}:
+            bump_user_version(user_id)
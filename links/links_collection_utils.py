@@ -0,0 +1,81 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.models.signals import m2m_changed
+
+from core.db import write_atomic
+from links.models import UserLink
+
+OPERATION_ADD = 'add'
+OPERATION_REMOVE = 'remove'
+OPERATION_REPLACE = 'replace'
+OPERATIONS = [OPERATION_ADD, OPERATION_REMOVE, OPERATION_REPLACE]
+
+
+def owned_link_ids(user_id, ids):
+    """
+    Ids of the list that belong to the user links in the submitted order, checked in one IN query
+    """
+    ids = list(dict.fromkeys(pk for pk in ids if isinstance(pk, int) and not isinstance(pk, bool)))
+    owned = set(UserLink.objects.filter(user_id=user_id, id__in=ids).values_list('id', flat=True))
+    return [pk for pk in ids if pk in owned]
+
+
+def change_collection_links(collection, operation, ids):
+    """
+    Adding, removing or replacing the links of the collection, the through table is changed
+    with one executemany insert and one delete. Returns the added and the removed link ids
+    """
+    ids = set(ids)
+    through = collection.user_links.through
+    with write_atomic():
+        current = set(through.objects.filter(userlinkcollection=collection).values_list('userlink_id', flat=True))
+        if operation == OPERATION_ADD:
+            added, removed = ids - current, set()
+        elif operation == OPERATION_REMOVE:
+            added, removed = set(), ids & current
+        else:
+            added, removed = ids - current, current - ids
+        if removed:
+            with m2m_signals(collection, 'remove', removed):
+                through.objects.filter(userlinkcollection=collection, userlink_id__in=removed).delete()
+        if added:
+            with m2m_signals(collection, 'add', added):
+                insert_through_rows(collection, added)
+        collection.save(update_fields=['change_date'])
+    return sorted(added), sorted(removed)
+
+
+def insert_through_rows(collection, link_ids):
+    """
+    Inserting the membership rows with one prepared statement, RelatedManager.add() builds a model
+    instance per row and splits the insert into batches of the query parameters limit
+    """
+    through = collection.user_links.through
+    quote = connection.ops.quote_name
+    table = quote(through._meta.db_table)
+    owner = quote(through._meta.get_field('userlinkcollection').column)
+    target = quote(through._meta.get_field('userlink').column)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} ({owner}, {target}) VALUES (%s, %s)',
+            [(collection.id, link_id) for link_id in sorted(link_ids)],
+        )
+
+
+@contextmanager
+def m2m_signals(collection, change, link_ids):
+    """
+    Sending the m2m_changed signals RelatedManager.add() and remove() would send around the change
+    """
+    kwargs = {
+        'sender': collection.user_links.through,
+        'instance': collection,
+        'reverse': False,
+        'model': UserLink,
+        'pk_set': set(link_ids),
+        'using': connection.alias,
+    }
+    m2m_changed.send(action=f'pre_{change}', **kwargs)
+    yield
+    m2m_changed.send(action=f'post_{change}', **kwargs)
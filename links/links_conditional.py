@@ -0,0 +1,71 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def change_stamp(queryset):
+    """
+    (latest change_date, row count) of the queryset in one aggregate over the (user, change_date) index.
+    An edit moves the latest date, an insert or a delete the count
+    """
+    stamp = queryset.order_by().aggregate(last=Max('change_date'), count=Count('id'))
+    return stamp['last'], stamp['count']
+
+
+async def achange_stamp(queryset):
+    stamp = await queryset.order_by().aaggregate(last=Max('change_date'), count=Count('id'))
+    return stamp['last'], stamp['count']
+
+
+def stamp_etag(request, stamps):
+    """
+    Strong ETag of a response: the same user, url, host, format and change stamps give the same bytes
+    """
+    key = repr((request.user.id, request.get_host(), request.get_full_path(), request.accepted_renderer.format, stamps))
+    return '"{}"'.format(hashlib.sha256(key.encode()).hexdigest()[:40])
+
+
+def stamp_validators(request, stamps):
+    etag = stamp_etag(request, stamps)
+    dates = [last for last, count in stamps if last is not None]
+    return etag, int(max(dates).timestamp()) if dates else None
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code not in (200, 304):
+        return response
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # the response is per user and is revalidated on every poll
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_response(request, stamps, respond, use_last_modified):
+    """
+    304 Not Modified when the request validators match the stamps, otherwise the response of respond()
+    with its validators. Last-Modified alone cannot tell a delete, so it is only checked for single objects
+    """
+    etag, last_modified = stamp_validators(request, stamps)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified if use_last_modified else None
+    )
+    if response is None:
+        response = respond()
+    return set_validators(response, etag, last_modified)
+
+
+async def aconditional_response(request, stamps, respond, use_last_modified):
+    """
+    conditional_response for the async views, respond is a coroutine function
+    """
+    etag, last_modified = stamp_validators(request, stamps)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified if use_last_modified else None
+    )
+    if response is None:
+        response = await respond()
+    return set_validators(response, etag, last_modified)
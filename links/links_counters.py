@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class SharedCounters:
+    """
+    Counters summed over the server processes and the links worker in the LINKS_COUNTERS_CACHE cache.
+    The counts are kept in the process and added to the cache at most once per LINKS_COUNTERS_FLUSH_INTERVAL
+    seconds, so counting is not a cache write on every call. A process that exits loses its last interval
+    """
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._flush_at = 0.0
+
+    @staticmethod
+    def cache():
+        return caches[settings.LINKS_COUNTERS_CACHE]
+
+    def add(self, name, count=1):
+        now = time.monotonic()
+        with self._lock:
+            self._pending[name] += count
+            due = now >= self._flush_at
+            if due:
+                self._flush_at = now + settings.LINKS_COUNTERS_FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        for name, count in pending.items():
+            key = f'{self.prefix}:{name}'
+            try:
+                self.cache().incr(key, count)
+            except ValueError:
+                if not self.cache().add(key, count, timeout=None):
+                    self.cache().incr(key, count)
+
+    def get_many(self, names):
+        """
+        Counts of all the processes, the counts of this one are flushed first
+        """
+        self.flush()
+        counts = self.cache().get_many([f'{self.prefix}:{name}' for name in names])
+        return {name: counts.get(f'{self.prefix}:{name}', 0) for name in names}
+
+    def reset(self, names):
+        with self._lock:
+            for name in names:
+                self._pending.pop(name, None)
+        self.cache().delete_many([f'{self.prefix}:{name}' for name in names])
@@ -0,0 +1,162 @@
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+
+# fields whose representation is the database value itself
+PLAIN_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.ChoiceField, serializers.IntegerField,
+    serializers.ReadOnlyField, PrimaryKeyRelatedField,
+)
+
+
+def iso_datetime(value):
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class ValuesSerializer:
+    """
+    Serializing values() rows into the same output as the model serializer it is built from, without
+    instantiating and running the serializer fields for every row. The converter of every field is picked once,
+    the fields dropped by ?fields=/?omit= are already gone from the serializer
+    """
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.request = serializer.context.get('request')
+        self.fields = []
+        self.columns = []
+        # many to many fields are loaded separately and put into the rows under (name,)
+        self.many = []
+        for name, field in serializer.fields.items():
+            if isinstance(field, ManyRelatedField):
+                if not isinstance(field.child_relation, PrimaryKeyRelatedField):
+                    raise TypeError(f'{name}: only primary key relations can be read from values()')
+                self.many.append((name, field.source, None))
+                self.fields.append((name, (name,), None))
+            elif isinstance(field, serializers.ListSerializer):
+                self.many.append((name, field.source, ValuesSerializer(field.child)))
+                self.fields.append((name, (name,), None))
+            else:
+                self.columns.append(field.source)
+                self.fields.append((name, field.source, self._converter(field)))
+
+    def values(self, queryset, *extra):
+        """
+        The queryset narrowed to the columns of the fields, extra columns are read but not serialized
+        """
+        return queryset.prefetch_related(None).values(*dict.fromkeys(['id', *self.columns, *extra]))
+
+    def serialize(self, rows):
+        rows = list(rows)
+        ids = [row['id'] for row in rows]
+        loaded = {}
+        for name, source, child in self.many:
+            if source not in loaded:
+                loaded[source] = self._load_many(source, ids)
+            related = loaded[source]
+            if child is not None:
+                embedded = self._load_embedded(source, child, ids)
+                related = {owner_id: [embedded[pk] for pk in pks] for owner_id, pks in related.items()}
+            for row in rows:
+                row[(name,)] = related.get(row['id'], [])
+        fields = self.fields
+        return [
+            {
+                name: value if convert is None or value is None else convert(value)
+                for name, source, convert in fields
+                for value in (row[source],)
+            }
+            for row in rows
+        ]
+
+    def _converter(self, field):
+        if isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+            if output_format is not None and output_format.lower() == ISO_8601:
+                return self._datetime_converter(field)
+        elif isinstance(field, serializers.FileField):
+            return self._file_converter(field)
+        elif isinstance(field, PLAIN_FIELDS):
+            return None
+        return field.to_representation
+
+    @staticmethod
+    def _datetime_converter(field):
+        field_timezone = getattr(field, 'timezone', None) or field.default_timezone()
+
+        def convert(value):
+            if field_timezone is not None:
+                value = value.astimezone(field_timezone) if timezone.is_aware(value) \
+                    else timezone.make_aware(value, field_timezone)
+            return iso_datetime(value)
+        return convert
+
+    def _file_converter(self, field):
+        storage = self.model._meta.get_field(field.source).storage
+        use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+        request = self.request
+        # pictures are shared between links, every stored name is turned into an url once
+        urls = {}
+        prefix = unset = object()
+
+        def convert(name):
+            nonlocal prefix
+            if not name:
+                return None
+            if not use_url:
+                return name
+            url = urls.get(name)
+            if url is None:
+                if prefix is unset:
+                    # the host of the request is checked on the first url, as the model serializer does
+                    prefix = self._url_prefix(storage)
+                path = filepath_to_uri(name).lstrip('/')
+                if prefix is not None and '//' not in path and '/.' not in f'/{path}':
+                    url = prefix + path
+                else:
+                    url = storage.url(name)
+                    url = request.build_absolute_uri(url) if request is not None else url
+                urls[name] = url
+            return url
+        return convert
+
+    def _url_prefix(self, storage):
+        """
+        Absolute url of the storage root when the url of a file is the root followed by its quoted name,
+        that is what storage.url() and build_absolute_uri() give for plain names of a file system storage
+        """
+        if not isinstance(storage, FileSystemStorage):
+            return None
+        base_url = storage.base_url
+        if self.request is None:
+            return base_url
+        if base_url.startswith('/') and not base_url.startswith('//'):
+            return self.request.build_absolute_uri(base_url)
+        return None
+
+    def _load_many(self, source, ids):
+        """
+        Related ids of every row in one query on the through table
+        """
+        field = self.model._meta.get_field(source)
+        through = field.remote_field.through
+        owner, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        related = {}
+        pairs = through.objects.filter(**{f'{owner}_id__in': ids}).order_by(owner, target)
+        for owner_id, target_id in pairs.values_list(f'{owner}_id', f'{target}_id'):
+            related.setdefault(owner_id, []).append(target_id)
+        return related
+
+    def _load_embedded(self, source, child, ids):
+        """
+        Serialized related objects of the rows by their id, in one query joined through the relation
+        """
+        field = self.model._meta.get_field(source)
+        queryset = field.related_model.objects.filter(**{f'{field.related_query_name()}__in': ids}).distinct()
+        rows = list(child.values(queryset))
+        return dict(zip((row['id'] for row in rows), child.serialize(rows)))
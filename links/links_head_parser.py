@@ -0,0 +1,124 @@
+import codecs
+import re
+from html.parser import HTMLParser
+
+from django.conf import settings
+
+from links.links_http_client import CHUNK_SIZE, open_stream
+
+OG_PROPERTIES = ('og:title', 'og:description', 'og:url', 'og:type', 'og:image')
+META_NAMES = ('description',)
+
+CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+class HeadMetaParser(HTMLParser):
+    """
+    Collecting the title and the og/description meta tags in a single pass.
+    The parser is done once the head is over, so the rest of the document can be left unread
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta = {}
+        self.done = False
+        self._title = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            # the rest of the chunk that ended the head
+            return
+        if tag == 'meta':
+            attrs = dict(attrs)
+            if attrs.get('property') in OG_PROPERTIES:
+                key = attrs['property']
+            elif attrs.get('name') in META_NAMES:
+                key = attrs['name']
+            else:
+                return
+            if key not in self.meta and attrs.get('content') is not None:
+                self.meta[key] = attrs['content']
+        elif tag == 'title' and 'title' not in self.meta:
+            self._title = []
+        elif tag == 'body':
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == 'title' and self._title is not None:
+            self.meta['title'] = ''.join(self._title)
+            self._title = None
+        elif tag == 'head':
+            self.done = True
+
+    def handle_data(self, data):
+        if self._title is not None:
+            self._title.append(data)
+
+
+def sniff_encoding(head, declared=None):
+    """
+    Encoding of the document: the charset of the Content-Type header, then the meta charset, then utf-8
+    """
+    if not declared:
+        match = CHARSET_RE.search(head)
+        declared = match.group(1).decode('ascii') if match else None
+    try:
+        return codecs.lookup(declared).name if declared else 'utf-8'
+    except LookupError:
+        return 'utf-8'
+
+
+class HeadMetaReader:
+    """
+    Incremental side of parse_head_meta for the callers that receive the chunks themselves,
+    feed() returns True once the rest of the document can be left unread
+    """
+    def __init__(self, max_bytes, declared_encoding=None):
+        self.max_bytes = max_bytes
+        self.declared_encoding = declared_encoding
+        self.parser = HeadMetaParser()
+        self.decoder = None
+        self.read = 0
+
+    def feed(self, chunk):
+        chunk = chunk[:self.max_bytes - self.read]
+        self.read += len(chunk)
+        if self.decoder is None:
+            self.decoder = codecs.getincrementaldecoder(sniff_encoding(chunk, self.declared_encoding))(errors='replace')
+        self.parser.feed(self.decoder.decode(chunk))
+        return self.parser.done or self.read >= self.max_bytes
+
+    def close(self):
+        if not self.parser.done and self.decoder is not None:
+            self.parser.feed(self.decoder.decode(b'', final=True))
+            self.parser.close()
+        return self.parser.meta
+
+
+def parse_head_meta(chunks, max_bytes, declared_encoding=None):
+    """
+    Feeding the byte chunks of a document to HeadMetaParser until the head is over or max_bytes are read
+    """
+    reader = HeadMetaReader(max_bytes, declared_encoding)
+    for chunk in chunks:
+        if reader.feed(chunk):
+            break
+    return reader.close()
+
+
+def extract_page_meta(url):
+    """
+    Streaming the page and reading its meta tags, the download stops at </head> or LINKS_FETCH_MAX_HEAD_BYTES.
+    Returns the meta tags and the final url of the page after redirects. An error page is not parsed,
+    requests.HTTPError is raised for it so that its metadata is not cached
+    """
+    with open_stream(url) as response:
+        response.raise_for_status()
+        declared = None
+        if 'charset' in response.headers.get('Content-Type', ''):
+            declared = response.encoding
+        meta = parse_head_meta(
+            response.iter_content(CHUNK_SIZE),
+            settings.LINKS_FETCH_MAX_HEAD_BYTES,
+            declared_encoding=declared,
+        )
+        return meta, response.url
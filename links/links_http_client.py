@@ -0,0 +1,120 @@
+import threading
+from contextlib import contextmanager
+from http.cookiejar import CookiePolicy
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from links.links_create_utils import cookies, headers
+
+CHUNK_SIZE = 16 * 1024
+
+
+class ResponseTooLarge(Exception):
+    """
+    The remote resource is bigger than the allowed body size
+    """
+
+
+class RejectCookiePolicy(CookiePolicy):
+    """
+    Cookie policy that keeps the cookies set by fetched sites out of the shared session
+    """
+    netscape = True
+    rfc2965 = False
+    hide_cookie2 = False
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+    def domain_return_ok(self, domain, request):
+        return False
+
+    def path_return_ok(self, path, request):
+        return False
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Module-level session, its per-host connection pools stay alive across requests of the process
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=settings.LINKS_FETCH_POOL_HOSTS,
+                    pool_maxsize=settings.LINKS_FETCH_POOL_SIZE,
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(headers)
+                session.cookies.set_policy(RejectCookiePolicy())
+                _session = session
+    return _session
+
+
+def _read_body(response, max_bytes):
+    length = response.headers.get('Content-Length')
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise ResponseTooLarge(f'{response.url} is {length} bytes, the limit is {max_bytes}')
+
+    body = bytearray()
+    for chunk in response.iter_content(CHUNK_SIZE):
+        body += chunk
+        if len(body) > max_bytes:
+            raise ResponseTooLarge(f'{response.url} is over the limit of {max_bytes} bytes')
+    return bytes(body)
+
+
+@contextmanager
+def open_stream(url):
+    """
+    Streamed response of the url from the shared session, the body is read on demand
+    """
+    with get_session().get(
+        url,
+        cookies=cookies,
+        timeout=(settings.LINKS_FETCH_CONNECT_TIMEOUT, settings.LINKS_FETCH_READ_TIMEOUT),
+        stream=True,
+    ) as response:
+        yield response
+
+
+def resolve_redirects(url):
+    """
+    Final url after following the redirects of the url, the body is not downloaded
+    """
+    timeout = (settings.LINKS_FETCH_CONNECT_TIMEOUT, settings.LINKS_FETCH_READ_TIMEOUT)
+    response = get_session().head(url, cookies=cookies, timeout=timeout, allow_redirects=True)
+    if response.status_code == 405:
+        # some shorteners only redirect GET requests
+        with open_stream(url) as response:
+            pass
+    return response.url
+
+
+def fetch(url, max_bytes):
+    """
+    Downloading the body of the url through the shared session with timeouts and a size cap,
+    ResponseTooLarge is raised for bodies over max_bytes
+    """
+    with open_stream(url) as response:
+        response.raise_for_status()
+        return _read_body(response, max_bytes)
+
+
+def fetch_image(url):
+    """
+    Downloading the picture, pictures over LINKS_FETCH_MAX_IMAGE_BYTES are rejected
+    """
+    return fetch(url, settings.LINKS_FETCH_MAX_IMAGE_BYTES)
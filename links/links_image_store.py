@@ -0,0 +1,140 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.utils import timezone
+
+from links.links_thumbnails import THUMBNAIL_SIZES, fallback_extension, make_thumbnails
+from links.models import LinkImage, LinkMetadata, UserLink
+
+# name of a picture of the store, see image_name
+STORED_NAME_RE = re.compile(
+    re.escape(UserLink._meta.get_field('image').upload_to) + r'[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})\.(?P<extension>\w+)'
+)
+
+
+def image_name(digest, extension, suffix=''):
+    """
+    Immutable storage name of a picture: the upload directory, a two-letter fan-out and the content hash.
+    The size variants add a suffix, e.g. <hash>_150.webp
+    """
+    upload_to = UserLink._meta.get_field('image').upload_to
+    return f'{upload_to}{digest[:2]}/{digest}{suffix}.{extension}'
+
+
+def thumbnail_names(name):
+    """
+    Storage names of the size variants of a stored picture by size and extension, e.g.
+    {300: {'webp': '<hash>_300.webp', 'jpg': '<hash>_300.jpg'}, ...}. None for the pictures outside the store
+    """
+    match = STORED_NAME_RE.fullmatch(name or '')
+    if match is None:
+        return None
+    digest = match['digest']
+    extensions = ('webp', fallback_extension(match['extension']))
+    return {
+        size: {extension: image_name(digest, extension, f'_{size}') for extension in extensions}
+        for size in THUMBNAIL_SIZES
+    }
+
+
+def stored_names(name):
+    """
+    The main picture and the names of its size variants that the serialized links point to
+    """
+    return [name, *(variant for names in (thumbnail_names(name) or {}).values() for variant in names.values())]
+
+
+def _write_atomically(name, content):
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp_file:
+        tmp_file.write(content)
+    os.replace(tmp_path, path)
+
+
+def store_image(content):
+    """
+    Storing the picture under the hash of its content, returns the storage name.
+    The same picture downloaded for several links is written only once
+    """
+    return register_image(*write_image_files(content))
+
+
+def write_image_files(content):
+    """
+    The files of store_image without its database write, returns the (digest, name, size) for register_image.
+    The size is None when the picture is already stored
+    """
+    digest = hashlib.sha256(content).hexdigest()
+    image = LinkImage.objects.filter(sha256=digest).first()
+    if image is not None and all(map(default_storage.exists, stored_names(image.name))):
+        return digest, image.name, None
+
+    variants = make_thumbnails(content)
+    for suffix, extension, data in variants:
+        variant_name = image_name(digest, extension, suffix)
+        if not default_storage.exists(variant_name):
+            _write_atomically(variant_name, data)
+    _, extension, main = variants[0]
+    return digest, image_name(digest, extension), len(main)
+
+
+def register_image(digest, name, size):
+    if size is not None:
+        LinkImage.objects.get_or_create(sha256=digest, defaults={
+            'name': name,
+            'size': size,
+            'released_at': timezone.now(),
+        })
+    return name
+
+
+def acquire_image(name):
+    """
+    Counting one more link that uses the stored picture, names outside the store are ignored
+    """
+    if name:
+        LinkImage.objects.filter(name=name).update(ref_count=F('ref_count') + 1, released_at=None)
+
+
+def acquire_images(counts):
+    """
+    Counting the references of links inserted in bulk, counts maps picture names to their number of links
+    """
+    for name, count in counts.items():
+        if name:
+            LinkImage.objects.filter(name=name).update(ref_count=F('ref_count') + count, released_at=None)
+
+
+def release_image(name):
+    """
+    Counting one link less, pictures nobody uses are removed later by collect_unused_images
+    """
+    if name:
+        LinkImage.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+        LinkImage.objects.filter(name=name, ref_count=0, released_at__isnull=True).update(released_at=timezone.now())
+
+
+def collect_unused_images(grace_period):
+    """
+    Deleting the pictures without links for longer than grace_period, unless the metadata cache still
+    refers to them. Returns the number of deleted pictures
+    """
+    unused = LinkImage.objects.filter(
+        ref_count=0,
+        released_at__lt=timezone.now() - grace_period,
+    ).exclude(name__in=LinkMetadata.objects.values('image'))
+    deleted = 0
+    for image in unused:
+        if LinkImage.objects.filter(id=image.id, ref_count=0).delete()[0]:
+            directory = os.path.dirname(image.name)
+            for file_name in default_storage.listdir(directory)[1]:
+                if file_name.startswith(image.sha256):
+                    default_storage.delete(f'{directory}/{file_name}')
+            deleted += 1
+    return deleted
@@ -0,0 +1,206 @@
+from django.db import DatabaseError, IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from core.db import write_atomic
+from links.links_head_parser import extract_page_meta
+from links.links_http_client import fetch_image
+from links.links_image_store import store_image
+from links.links_metadata_cache import metadata_cache
+from links.links_url_resolver import canonicalize_url
+from links.links_url_utils import clean_url, url_hash
+from links.models import UserLink, LinkIngestJob
+
+DEFAULT_IMAGE_URL = 'https://i.postimg.cc/90WC7pzc/default.png'
+DEFAULT_IMAGE = UserLink._meta.get_field('image').default
+DUPLICATE_LINK_MESSAGE = 'The link is already in the collection'
+
+
+class DuplicateLinkError(Exception):
+    """
+    The user already has a link with the same url
+    """
+
+
+def get_link_data(link):
+    """
+    Fetching the head of the page and collecting the link metadata from its meta tags
+    """
+    return link_data(link, *extract_page_meta(link))
+
+
+def link_data(link, meta, final_url):
+    """
+    Link metadata from the meta tags of the page and its final url
+    """
+    data = {}
+
+    if 'og:title' in meta:
+        data['title'] = meta['og:title']
+    elif 'title' in meta:
+        data['title'] = meta['title']
+    else:
+        data['title'] = link[:100]
+
+    if 'og:description' in meta:
+        data['description'] = meta['og:description']
+    elif 'description' in meta:
+        data['description'] = meta['description']
+    else:
+        data['description'] = 'no description'
+
+    data['url'] = meta.get('og:url', clean_url(final_url))
+    data['link_type'] = meta.get('og:type', 'website')
+    data['image'] = meta.get('og:image', DEFAULT_IMAGE_URL)
+
+    return data
+
+
+def download_link(link):
+    """
+    Fetching the page metadata and the picture bytes without touching the database,
+    the picture is None for pages without og:image
+    """
+    data = get_link_data(link)
+    content = None if data['image'] == DEFAULT_IMAGE_URL else fetch_image(data['image'])
+    return data, content
+
+
+def store_downloaded_link(data, content):
+    """
+    Putting the downloaded picture into the content-addressed store,
+    'image' then holds the stored picture and 'image_url' the original one
+    """
+    data['image_url'] = data['image']
+    data['image'] = DEFAULT_IMAGE if content is None else store_image(content)
+    return data
+
+
+def fetch_link_metadata(link):
+    return store_downloaded_link(*download_link(link))
+
+
+def get_link_metadata(link):
+    """
+    Link metadata from the shared cache, the page is only fetched on a cache miss.
+    The link is expected in its canonical form, see links_url_resolver.canonicalize_url
+    """
+    return metadata_cache.get_or_fetch(link, fetch_link_metadata)
+
+
+def create_link(user_id, metadata):
+    """
+    Storing a ready link of the user from its metadata,
+    IntegrityError is raised if the user already has the url
+    """
+    with write_atomic():
+        return UserLink.objects.create(
+            user_id=user_id,
+            title=metadata['title'],
+            description=metadata['description'],
+            url=metadata['url'],
+            link_type=metadata['link_type'],
+            image=metadata['image']
+        )
+
+
+def link_exists(user_id, url, exclude_id=None):
+    """
+    Checking whether the user already has a link with the given url, a single probe of the (user, url_hash) index
+    """
+    links = UserLink.objects.filter(user_id=user_id, url_hash=url_hash(url))
+    if exclude_id is not None:
+        links = links.exclude(id=exclude_id)
+    return links.exists()
+
+
+def enrich_link(link):
+    """
+    Filling in the metadata of a pending link and marking it as ready
+    """
+    canonical = canonicalize_url(link.url)
+    if link_exists(link.user_id, canonical, exclude_id=link.id):
+        raise DuplicateLinkError(DUPLICATE_LINK_MESSAGE)
+    data = get_link_metadata(canonical)
+    if link_exists(link.user_id, data['url'], exclude_id=link.id):
+        raise DuplicateLinkError(DUPLICATE_LINK_MESSAGE)
+
+    link.title = data['title']
+    link.description = data['description']
+    link.url = data['url']
+    link.link_type = data['link_type']
+    link.image = data['image']
+    link.status = UserLink.STATUS_READY
+    try:
+        with write_atomic():
+            link.save()
+    except IntegrityError:
+        # the same url was added concurrently, the unique (user, url_hash) constraint rejected this one
+        raise DuplicateLinkError(DUPLICATE_LINK_MESSAGE)
+    return link
+
+
+def enqueue_link(user_id, url):
+    """
+    Storing a pending link and queueing a job that will fetch its metadata,
+    IntegrityError is raised if the user already has the url
+    """
+    link = UserLink.objects.create(
+        user_id=user_id,
+        title=url[:100],
+        description='',
+        url=url,
+        status=UserLink.STATUS_PENDING,
+    )
+    LinkIngestJob.objects.create(link=link)
+    return link
+
+
+def claim_ingest_job(batch_size=10):
+    """
+    Atomically taking the oldest queued job, returns None if the queue is empty
+    """
+    queued = LinkIngestJob.objects.filter(status=LinkIngestJob.STATUS_QUEUED).order_by('id')
+    for job_id in queued.values_list('id', flat=True)[:batch_size]:
+        claimed = LinkIngestJob.objects.filter(id=job_id, status=LinkIngestJob.STATUS_QUEUED).update(
+            status=LinkIngestJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return LinkIngestJob.objects.select_related('link').get(id=job_id)
+    return None
+
+
+def requeue_stale_jobs(older_than):
+    """
+    Returning to the queue the jobs left running by a worker that died, returns their count
+    """
+    return LinkIngestJob.objects.filter(
+        status=LinkIngestJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - older_than,
+    ).update(status=LinkIngestJob.STATUS_QUEUED)
+
+
+def process_ingest_job(job):
+    """
+    Running a claimed job: the link becomes ready on success and failed otherwise
+    """
+    link = job.link
+    try:
+        enrich_link(link)
+    except Exception as e:
+        job.status = LinkIngestJob.STATUS_FAILED
+        job.error = str(e) or e.__class__.__name__
+        # the job is finished even if the link cannot be marked, a failed job is not requeued
+        try:
+            link.status = UserLink.STATUS_FAILED
+            link.save(update_fields=['status', 'change_date'])
+        except DatabaseError as save_error:
+            job.error = f'{job.error}, the link was not marked as failed: {save_error}'
+    else:
+        job.status = LinkIngestJob.STATUS_DONE
+        job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
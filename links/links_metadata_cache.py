@@ -0,0 +1,305 @@
+import asyncio
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from links.links_async_db import write
+from links.links_counters import SharedCounters
+from links.models import LinkMetadata
+
+PRUNE_EVERY = 100
+
+
+class LinkMetadataCache:
+    """
+    Cache of the page metadata shared between users, keyed by url.
+    Entries live for LINKS_METADATA_CACHE_TTL seconds, the least recently used ones are evicted
+    above LINKS_METADATA_CACHE_MAX_ENTRIES. Concurrent misses of the same url wait for a single fetch:
+    threads of the process through an in-flight event, requests of an event loop through an in-flight task,
+    other processes through a claim on the row. The hits and misses of all processes are shown by
+    `python manage.py links_metadata_cache_stats`
+    """
+    def __init__(self):
+        self.counters = SharedCounters('links:metadata')
+        self._stores = 0
+        self._entry_hits = Counter()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._tasks = {}
+
+    def get(self, url):
+        fresh_since = timezone.now() - timedelta(seconds=settings.LINKS_METADATA_CACHE_TTL)
+        entry = LinkMetadata.objects.filter(url=url, fetched_at__gte=fresh_since).first()
+        if entry is None:
+            return None
+        self._touch([entry])
+        return self._to_data(entry)
+
+    def get_many(self, urls):
+        """
+        Cached metadata of the urls found in the cache in one query, counted as hits
+        """
+        fresh_since = timezone.now() - timedelta(seconds=settings.LINKS_METADATA_CACHE_TTL)
+        entries = list(LinkMetadata.objects.filter(url__in=urls, fetched_at__gte=fresh_since))
+        self._touch(entries)
+        if entries:
+            self.counters.add('hits', len(entries))
+        return {entry.url: self._to_data(entry) for entry in entries}
+
+    def set(self, url, data):
+        now = timezone.now()
+        LinkMetadata.objects.update_or_create(url=url, defaults={
+            'title': data['title'][:100],
+            'description': data['description'][:1000],
+            'og_url': data['url'],
+            'link_type': data['link_type'],
+            'image_url': data['image_url'],
+            'image': data['image'],
+            'fetched_at': now,
+            'fetching_since': None,
+            'last_used': now,
+        })
+        with self._lock:
+            self._stores += 1
+            prune = self._stores % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def get_or_fetch(self, url, fetch):
+        """
+        Returning the cached metadata of the url, fetch(url) is called on a miss
+        """
+        data = self.get(url)
+        if data is not None:
+            return self._hit(data)
+
+        with self._lock:
+            event = self._inflight.get(url)
+            leader = event is None
+            if leader:
+                event = self._inflight[url] = threading.Event()
+
+        if not leader:
+            event.wait(settings.LINKS_METADATA_CACHE_FETCH_WAIT)
+            data = self.get(url)
+            if data is not None:
+                return self._hit(data)
+            return self._fetch(url, fetch)
+
+        try:
+            if not self._claim(url):
+                data = self._wait_for(url)
+                if data is not None:
+                    return self._hit(data)
+            return self._fetch(url, fetch)
+        finally:
+            with self._lock:
+                del self._inflight[url]
+            event.set()
+
+    def get_or_fetch_many(self, urls, fetch_many):
+        """
+        get_or_fetch for many urls, fetch_many(urls) returns the metadata or the exception of every url.
+        The cached entries are read in one query, the urls already fetched by another thread or process
+        are waited for instead of being fetched again
+        """
+        metadata = self.get_many(urls)
+        missing = [url for url in dict.fromkeys(urls) if url not in metadata]
+
+        events, waiting = {}, {}
+        with self._lock:
+            for url in missing:
+                event = self._inflight.get(url)
+                if event is None:
+                    events[url] = self._inflight[url] = threading.Event()
+                else:
+                    waiting[url] = event
+
+        try:
+            claimed = [url for url in events if self._claim(url)]
+            metadata.update(self._fetch_many(claimed, fetch_many))
+            metadata.update(self._wait_for_many([url for url in events if url not in metadata]))
+        finally:
+            with self._lock:
+                for url in events:
+                    del self._inflight[url]
+            for event in events.values():
+                event.set()
+
+        deadline = time.monotonic() + settings.LINKS_METADATA_CACHE_FETCH_WAIT
+        for event in waiting.values():
+            event.wait(max(deadline - time.monotonic(), 0))
+        if waiting:
+            metadata.update(self.get_many(list(waiting)))
+        # the fetches that failed or took too long elsewhere are done here
+        metadata.update(self._fetch_many([url for url in missing if url not in metadata], fetch_many))
+        return metadata
+
+    async def aget_or_fetch(self, url, fetch):
+        """
+        get_or_fetch for the async views, fetch(url) is a coroutine function. The task of the fetch
+        outlives a cancelled request, so the other requests waiting for it still get the metadata
+        """
+        data = await sync_to_async(self.get)(url)
+        if data is not None:
+            return self._hit(data)
+
+        loop = asyncio.get_running_loop()
+        key = (loop, url)
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = loop.create_task(self._afetch(url, fetch))
+            task.add_done_callback(lambda done: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
+
+    def prune(self):
+        """
+        Evicting the least recently used entries over the size limit
+        """
+        excess = LinkMetadata.objects.count() - settings.LINKS_METADATA_CACHE_MAX_ENTRIES
+        if excess > 0:
+            ids = list(LinkMetadata.objects.order_by('last_used').values_list('id', flat=True)[:excess])
+            LinkMetadata.objects.filter(id__in=ids).delete()
+
+    def stats(self):
+        """
+        Hits, misses and the hit ratio of all processes since the counters were last reset, and the cached entries
+        """
+        counts = self.counters.get_many(['hits', 'misses'])
+        lookups = counts['hits'] + counts['misses']
+        return {
+            **counts,
+            'hit_ratio': counts['hits'] / lookups if lookups else 0.0,
+            'size': LinkMetadata.objects.filter(fetched_at__isnull=False).count(),
+        }
+
+    def reset_stats(self):
+        self.counters.reset(['hits', 'misses'])
+
+    def count_misses(self, count):
+        self.counters.add('misses', count)
+
+    def _fetch(self, url, fetch):
+        self.count_misses(1)
+        try:
+            data = fetch(url)
+        except Exception:
+            LinkMetadata.objects.filter(url=url).update(fetching_since=None)
+            raise
+        self.set(url, data)
+        return data
+
+    def _fetch_many(self, urls, fetch_many):
+        if not urls:
+            return {}
+        self.count_misses(len(urls))
+        try:
+            fetched = fetch_many(urls)
+        except Exception:
+            LinkMetadata.objects.filter(url__in=urls).update(fetching_since=None)
+            raise
+        failed = [url for url, data in fetched.items() if isinstance(data, BaseException)]
+        if failed:
+            LinkMetadata.objects.filter(url__in=failed).update(fetching_since=None)
+        for url, data in fetched.items():
+            if not isinstance(data, BaseException):
+                self.set(url, data)
+        return fetched
+
+    async def _afetch(self, url, fetch):
+        if not await write(self._claim, url):
+            data = await self._await_for(url)
+            if data is not None:
+                return self._hit(data)
+        self.count_misses(1)
+        try:
+            data = await fetch(url)
+        except Exception:
+            await write(LinkMetadata.objects.filter(url=url).update, fetching_since=None)
+            raise
+        await write(self.set, url, data)
+        return data
+
+    def _touch(self, entries):
+        # a hit is a read: the hits are counted in the process and written with last_used only once the entry
+        # was last marked more than LINKS_METADATA_CACHE_TOUCH_INTERVAL ago, which is enough for the eviction order
+        now = timezone.now()
+        touch_before = now - timedelta(seconds=settings.LINKS_METADATA_CACHE_TOUCH_INTERVAL)
+        due = defaultdict(list)
+        with self._lock:
+            for entry in entries:
+                self._entry_hits[entry.id] += 1
+                if entry.last_used < touch_before:
+                    due[self._entry_hits.pop(entry.id)].append(entry.id)
+        for hits, ids in due.items():
+            LinkMetadata.objects.filter(id__in=ids).update(hits=F('hits') + hits, last_used=now)
+
+    def _hit(self, data):
+        self.counters.add('hits')
+        return data
+
+    def _claim(self, url):
+        now = timezone.now()
+        entry, created = LinkMetadata.objects.get_or_create(url=url, defaults={'fetching_since': now})
+        if created:
+            return True
+        stale = now - timedelta(seconds=settings.LINKS_METADATA_CACHE_FETCH_WAIT)
+        return bool(LinkMetadata.objects.filter(
+            Q(fetching_since__isnull=True) | Q(fetching_since__lt=stale), id=entry.id,
+        ).update(fetching_since=now))
+
+    def _wait_for(self, url):
+        deadline = time.monotonic() + settings.LINKS_METADATA_CACHE_FETCH_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.2)
+            data = self.get(url)
+            if data is not None:
+                return data
+            if not LinkMetadata.objects.filter(url=url, fetching_since__isnull=False).exists():
+                break
+        return None
+
+    def _wait_for_many(self, urls):
+        # _wait_for of all the urls at once, the urls no longer being fetched are not waited for
+        found = {}
+        deadline = time.monotonic() + settings.LINKS_METADATA_CACHE_FETCH_WAIT
+        while urls and time.monotonic() < deadline:
+            time.sleep(0.2)
+            found.update(self.get_many(urls))
+            fetching = set(LinkMetadata.objects.filter(
+                url__in=[url for url in urls if url not in found], fetching_since__isnull=False,
+            ).values_list('url', flat=True))
+            urls = [url for url in urls if url in fetching]
+        return found
+
+    async def _await_for(self, url):
+        # _wait_for without holding the thread that runs the sync code of the async views
+        deadline = time.monotonic() + settings.LINKS_METADATA_CACHE_FETCH_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.2)
+            data = await sync_to_async(self.get)(url)
+            if data is not None:
+                return data
+            if not await LinkMetadata.objects.filter(url=url, fetching_since__isnull=False).aexists():
+                break
+        return None
+
+    @staticmethod
+    def _to_data(entry):
+        return {
+            'title': entry.title,
+            'description': entry.description,
+            'url': entry.og_url,
+            'link_type': entry.link_type,
+            'image_url': entry.image_url,
+            'image': entry.image,
+        }
+
+
+metadata_cache = LinkMetadataCache()
@@ -0,0 +1,104 @@
+from collections import Counter, defaultdict
+
+from django.db import connection
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+
+from core.db import write_atomic
+from links.models import LinkCountChange, UserLink, UserLinkDailyCount, UserLinkTotal
+from users.models import CustomUser
+
+
+def refresh_link_report():
+    """
+    Applying the change log to the daily counts and the totals of the top users report,
+    the changes of deleted users are dropped. Returns the number of consumed log rows
+    """
+    quote = connection.ops.quote_name
+    daily_table = quote(UserLinkDailyCount._meta.db_table)
+    total_table = quote(UserLinkTotal._meta.db_table)
+    user_table = quote(CustomUser._meta.db_table)
+    with write_atomic():
+        last = LinkCountChange.objects.aggregate(last=Max('id'))['last']
+        if last is None:
+            return 0
+        changes = LinkCountChange.objects.filter(id__lte=last)
+        daily = []
+        totals = Counter()
+        for row in changes.order_by().values('user_id', 'day', 'link_type').annotate(delta=Sum('delta')):
+            if row['delta']:
+                daily.append((connection.ops.adapt_datefield_value(row['day']), row['link_type'], row['delta'],
+                              row['user_id']))
+                totals[row['user_id']] += row['delta']
+        with connection.cursor() as cursor:
+            # the users are selected, so that the counts of a deleted user are not inserted back
+            cursor.executemany(
+                f'INSERT INTO {daily_table} (user_id, day, link_type, count) '
+                f'SELECT id, %s, %s, %s FROM {user_table} WHERE id = %s '
+                f'ON CONFLICT (user_id, day, link_type) DO UPDATE SET count = {daily_table}.count + excluded.count',
+                daily,
+            )
+            cursor.executemany(
+                f'INSERT INTO {total_table} (user_id, total, date_joined) '
+                f'SELECT id, %s, date_joined FROM {user_table} WHERE id = %s '
+                f'ON CONFLICT (user_id) DO UPDATE SET total = {total_table}.total + excluded.total',
+                [(delta, user_id) for user_id, delta in totals.items() if delta],
+            )
+        return changes.delete()[0]
+
+
+def rebuild_link_report():
+    """
+    Recounting the daily counts and the totals from the links in one grouped scan
+    """
+    with write_atomic():
+        LinkCountChange.objects.all().delete()
+        UserLinkDailyCount.objects.all().delete()
+        UserLinkTotal.objects.all().delete()
+        counts = (
+            UserLink.objects.order_by().annotate(day=TruncDate('creation_date'))
+            .values('user_id', 'day', 'link_type').annotate(count=Count('id'))
+        )
+        UserLinkDailyCount.objects.bulk_create((UserLinkDailyCount(**row) for row in counts.iterator()),
+                                               batch_size=1000)
+        totals = (
+            UserLinkDailyCount.objects.order_by().values('user_id', 'user__date_joined').annotate(total=Sum('count'))
+        )
+        UserLinkTotal.objects.bulk_create(
+            (UserLinkTotal(user_id=row['user_id'], date_joined=row['user__date_joined'], total=row['total'])
+             for row in totals.iterator()),
+            batch_size=1000,
+        )
+
+
+def top_users(limit, first_day=None, last_day=None):
+    """
+    Users with the most links, the earlier registered first on a tie, with their links per type.
+    Without a window the totals are read in index order, a window sums the daily counts of its days
+    """
+    counts = UserLinkDailyCount.objects.order_by()
+    if first_day is None and last_day is None:
+        users = UserLinkTotal.objects.filter(total__gt=0).order_by('-total', 'date_joined', 'user_id')
+    else:
+        if first_day is not None:
+            counts = counts.filter(day__gte=first_day)
+        if last_day is not None:
+            counts = counts.filter(day__lte=last_day)
+        users = (
+            counts.values('user_id').annotate(total=Sum('count')).filter(total__gt=0)
+            .order_by('-total', 'user__date_joined', 'user_id')
+        )
+    users = list(users.values_list('user_id', 'user__email', 'total')[:limit])
+
+    link_types = defaultdict(dict)
+    breakdown = (
+        counts.filter(user_id__in=[user_id for user_id, email, total in users])
+        .values('user_id', 'link_type').annotate(count=Sum('count')).order_by('user_id', 'link_type')
+    )
+    for row in breakdown:
+        if row['count']:
+            link_types[row['user_id']][row['link_type']] = row['count']
+    return [
+        {'id': user_id, 'email': email, 'total': total, 'link_types': link_types[user_id]}
+        for user_id, email, total in users
+    ]
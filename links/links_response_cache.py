@@ -0,0 +1,107 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from links.links_counters import SharedCounters
+
+KEY_PREFIX = 'links:response'
+# the lookups are counted in the process and added to the shared counters once per flush interval
+lookup_counters = SharedCounters(KEY_PREFIX)
+# response headers kept with the cached content
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary', 'Allow')
+
+
+def response_cache():
+    return caches[settings.LINKS_RESPONSE_CACHE]
+
+
+def user_version(user_id):
+    """
+    Current version of the cached responses of the user, a missing or evicted version starts a new one,
+    so the entries stored under an older one are never read again
+    """
+    key = f'{KEY_PREFIX}:version:{user_id}'
+    version = response_cache().get(key)
+    if version is None:
+        version = time.time_ns()
+        if not response_cache().add(key, version, timeout=None):
+            version = response_cache().get(key, version)
+    return version
+
+
+def bump_user_version(user_id):
+    """
+    Invalidating every cached response of the user once the current transaction commits,
+    a bump before the commit would let a concurrent read cache the old rows under the new version
+    """
+    key = f'{KEY_PREFIX}:version:{user_id}'
+    transaction.on_commit(lambda: response_cache().set(key, time.time_ns(), timeout=None))
+
+
+def response_key(request):
+    request_key = repr((request.get_host(), request.get_full_path(), request.accepted_renderer.format))
+    digest = hashlib.sha256(request_key.encode()).hexdigest()[:40]
+    return f'{KEY_PREFIX}:{request.user.id}:{user_version(request.user.id)}:{digest}'
+
+
+def get_cached_response(request, endpoint):
+    """
+    The cached response of the request, 304 when its ETag matches If-None-Match. None on a miss
+    """
+    key = response_key(request)
+    entry = response_cache().get(key)
+    count_lookup(endpoint, hit=entry is not None)
+    if entry is None:
+        request.response_cache_key = key
+        return None
+    content_type, headers, content = entry
+    response = HttpResponse(content, content_type=content_type)
+    for name, value in headers:
+        response[name] = value
+    return get_conditional_response(request, etag=response.get('ETag'), response=response)
+
+
+def cache_response(request, response):
+    """
+    Storing the rendered 200 response of a missed request under the key it was looked up with
+    """
+    key = getattr(request, 'response_cache_key', None)
+    if key is None or response.status_code != 200:
+        return
+    headers = [(name, response[name]) for name in CACHED_HEADERS if response.has_header(name)]
+    response_cache().set(key, (response['Content-Type'], headers, response.content),
+                         timeout=settings.LINKS_RESPONSE_CACHE_TIMEOUT)
+
+
+def count_lookup(endpoint, hit):
+    lookup_counters.add(f'{"hits" if hit else "misses"}:{endpoint}')
+
+
+def counter_names(endpoints):
+    return [f'{kind}:{endpoint}' for endpoint in endpoints for kind in ('hits', 'misses')]
+
+
+def response_cache_stats(endpoints):
+    """
+    Hits, misses and the hit ratio of every endpoint over all processes since the counters were last reset
+    """
+    counters = lookup_counters.get_many(counter_names(endpoints))
+    stats = {}
+    for endpoint in endpoints:
+        hits = counters[f'hits:{endpoint}']
+        misses = counters[f'misses:{endpoint}']
+        stats[endpoint] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+        }
+    return stats
+
+
+def reset_response_cache_stats(endpoints):
+    lookup_counters.reset(counter_names(endpoints))
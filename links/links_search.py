@@ -0,0 +1,119 @@
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+SEARCH_TABLE = 'links_userlink_fts'
+# bm25 weights of the title, description, url and user_id columns, the owner column only scopes the search
+RANK_WEIGHTS = (10.0, 2.0, 1.0, 0.0)
+
+# the index is an external content table over links_userlink kept in sync by triggers,
+# so that bulk_create and queryset updates are indexed as well
+CREATE_STATEMENTS = (
+    f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        title, description, url, user_id,
+        content='links_userlink', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON links_userlink BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, title, description, url, user_id)
+        VALUES (new.id, new.title, new.description, new.url, new.user_id);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON links_userlink BEGIN
+        INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, title, description, url, user_id)
+        VALUES ('delete', old.id, old.title, old.description, old.url, old.user_id);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF title, description, url, user_id
+    ON links_userlink
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description
+        OR old.url IS NOT new.url OR old.user_id IS NOT new.user_id
+    BEGIN
+        INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, title, description, url, user_id)
+        VALUES ('delete', old.id, old.title, old.description, old.url, old.user_id);
+        INSERT INTO {SEARCH_TABLE} (rowid, title, description, url, user_id)
+        VALUES (new.id, new.title, new.description, new.url, new.user_id);
+    END
+    ''',
+)
+DROP_STATEMENTS = (
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_update',
+    f'DROP TABLE IF EXISTS {SEARCH_TABLE}',
+)
+REBUILD_STATEMENT = f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('rebuild')"
+OPTIMIZE_STATEMENT = f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"
+
+SEARCH_QUERY = f'''
+    SELECT rowid, rank FROM (
+        SELECT rowid, bm25({SEARCH_TABLE}, {', '.join(map(str, RANK_WEIGHTS))}) AS rank
+        FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s
+    )
+'''
+
+
+def search_available(using=DEFAULT_DB_ALIAS):
+    return connections[using].vendor == 'sqlite'
+
+
+def create_search_index(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Creating the search index and its triggers after migrate, the links stored before are indexed once
+    """
+    if not search_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+        exists = cursor.fetchone() is not None
+        for statement in CREATE_STATEMENTS:
+            cursor.execute(statement)
+        if not exists:
+            cursor.execute(REBUILD_STATEMENT)
+
+
+def rebuild_search_index(using=DEFAULT_DB_ALIAS):
+    """
+    Recreating the search index with its triggers and indexing all links again
+    """
+    with connections[using].cursor() as cursor:
+        for statement in DROP_STATEMENTS + CREATE_STATEMENTS:
+            cursor.execute(statement)
+        cursor.execute(REBUILD_STATEMENT)
+        cursor.execute(OPTIMIZE_STATEMENT)
+
+
+def match_expression(user_id, query):
+    """
+    FTS5 query of the search terms within the links of the user. Every term is quoted, so the FTS5 syntax
+    is not available to clients, a trailing * keeps its prefix meaning. None when there is nothing to search
+    """
+    terms = []
+    for term in query.split():
+        prefix = term.endswith('*')
+        term = term.rstrip('*')
+        if term:
+            terms.append('"{}"'.format(term.replace('"', '""')) + ('*' if prefix else ''))
+    if not terms:
+        return None
+    return f'user_id : "{int(user_id)}" AND ({" ".join(terms)})'
+
+
+def search_link_ids(expression, limit, position=None, reverse=False):
+    """
+    (id, rank) of the links matching the expression, best first, limit rows after the (rank, id) position.
+    With reverse the rows before the position are returned, nearest first
+    """
+    sql, params = SEARCH_QUERY, [expression]
+    before, order = ('<', 'DESC') if reverse else ('>', 'ASC')
+    if position is not None:
+        rank, pk = position
+        sql += f' WHERE rank {before} %s OR (rank = %s AND rowid {before} %s)'
+        params += [rank, rank, pk]
+    sql += f' ORDER BY rank {order}, rowid {order} LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
@@ -0,0 +1,96 @@
+from collections import Counter
+
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from core.db import write_atomic
+from links.models import LinkCountChange, UserLink, UserLinkTypeCount
+
+
+def link_day(moment):
+    return timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+
+
+def record_link_changes(deltas):
+    """
+    Applying {(user_id, link_type, creation day): delta} to the link type counters
+    and appending it to the change log the top users report is refreshed from
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    type_deltas = Counter()
+    for (user_id, link_type, day), delta in deltas.items():
+        type_deltas[user_id, link_type] += delta
+    change_link_type_counts(type_deltas)
+    LinkCountChange.objects.bulk_create(
+        LinkCountChange(user_id=user_id, link_type=link_type, day=day, delta=delta)
+        for (user_id, link_type, day), delta in deltas.items()
+    )
+
+
+def change_link_type_counts(deltas):
+    """
+    Applying {(user_id, link_type): delta} to the counters: increments are upserts, decrements plain updates,
+    so a counter is never created for a user who is being deleted
+    """
+    quote = connection.ops.quote_name
+    table = quote(UserLinkTypeCount._meta.db_table)
+    user, link_type, count = (quote(UserLinkTypeCount._meta.get_field(name).column)
+                              for name in ('user', 'link_type', 'count'))
+    increments = [(user_id, type_, delta) for (user_id, type_), delta in deltas.items() if delta > 0]
+    decrements = [(-delta, user_id, type_) for (user_id, type_), delta in deltas.items() if delta < 0]
+    with connection.cursor() as cursor:
+        if increments:
+            cursor.executemany(
+                f'INSERT INTO {table} ({user}, {link_type}, {count}) VALUES (%s, %s, %s) '
+                f'ON CONFLICT ({user}, {link_type}) DO UPDATE SET {count} = {table}.{count} + excluded.{count}',
+                increments,
+            )
+        if decrements:
+            cursor.executemany(
+                f'UPDATE {table} SET {count} = {count} - %s WHERE {user} = %s AND {link_type} = %s',
+                decrements,
+            )
+
+
+def count_links(links):
+    """
+    Counter deltas of newly inserted links
+    """
+    return Counter((link.user_id, link.link_type, link_day(link.creation_date)) for link in links)
+
+
+def user_link_stats(user_id):
+    counts = dict(
+        UserLinkTypeCount.objects.filter(user_id=user_id, count__gt=0)
+        .order_by('link_type').values_list('link_type', 'count')
+    )
+    return {'total': sum(counts.values()), 'link_types': counts}
+
+
+def reconcile_link_type_counts(dry_run=False):
+    """
+    Recounting the links of every type per user in one grouped scan and replacing the counters with the result.
+    Returns the drifted counters as {(user_id, link_type): (stored, actual)}
+    """
+    with write_atomic():
+        actual = {
+            (row['user_id'], row['link_type']): row['count']
+            for row in UserLink.objects.order_by().values('user_id', 'link_type').annotate(count=Count('id'))
+        }
+        stored = {
+            (row.user_id, row.link_type): row.count
+            for row in UserLinkTypeCount.objects.exclude(count=0)
+        }
+        drift = {
+            key: (stored.get(key, 0), actual.get(key, 0))
+            for key in stored.keys() | actual.keys() if stored.get(key, 0) != actual.get(key, 0)
+        }
+        if not dry_run:
+            UserLinkTypeCount.objects.all().delete()
+            UserLinkTypeCount.objects.bulk_create(
+                (UserLinkTypeCount(user_id=user_id, link_type=type_, count=count)
+                 for (user_id, type_), count in actual.items()),
+                batch_size=1000,
+            )
+    return drift
@@ -0,0 +1,91 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from PIL import Image
+from django.conf import settings
+
+THUMBNAIL_SIZES = (300, 150, 64)
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+def _encode(img, image_format, **params):
+    output = BytesIO()
+    img.save(output, format=image_format, **params)
+    return output.getvalue()
+
+
+def fallback_extension(extension):
+    """
+    Extension of the variants for the clients without WebP support: JPEG for JPEG pictures and PNG for the formats
+    that can be transparent, so the names of the variants follow from the name of the main picture
+    """
+    return 'jpg' if extension == 'jpg' else 'png'
+
+
+def render_thumbnails(content, sizes=THUMBNAIL_SIZES):
+    """
+    Decoding the picture once and rendering every variant from it.
+    Returns a list of (suffix, extension, bytes): the main picture fitted into the largest size in its
+    own format (suffix ''), then a WebP and a JPEG or PNG, see fallback_extension, for each size
+    """
+    img = Image.open(BytesIO(content))
+    source_format = img.format
+    largest = max(sizes)
+    if source_format == 'JPEG':
+        # let the decoder downscale by 1/2..1/8 instead of decoding the full resolution
+        img.draft('RGB', (largest, largest))
+    img.load()
+
+    variants = []
+    if img.width > largest or img.height > largest or source_format not in EXTENSIONS:
+        main = img.copy()
+        main.thumbnail((largest, largest))
+        main_format = source_format if source_format in EXTENSIONS else 'PNG'
+        variants.append(('', EXTENSIONS[main_format], _encode(main, main_format)))
+    else:
+        variants.append(('', EXTENSIONS[source_format], content))
+
+    transparent = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+    img = img.convert('RGBA' if transparent else 'RGB')
+    fallback_format = 'JPEG' if fallback_extension(variants[0][1]) == 'jpg' else 'PNG'
+    fallback_params = {'quality': 85} if fallback_format == 'JPEG' else {}
+    for size in sorted(sizes, reverse=True):
+        # each variant is scaled down from the previous one
+        img.thumbnail((size, size))
+        variants.append((f'_{size}', 'webp', _encode(img, 'WEBP', quality=80, method=4)))
+        variants.append((f'_{size}', EXTENSIONS[fallback_format], _encode(img, fallback_format, **fallback_params)))
+    return variants
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.LINKS_THUMBNAIL_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def make_thumbnails(content):
+    """
+    Rendering the variants in the process pool, inline when LINKS_THUMBNAIL_PROCESSES is 0
+    """
+    global _pool
+    if not settings.LINKS_THUMBNAIL_PROCESSES:
+        return render_thumbnails(content)
+    try:
+        return get_pool().submit(render_thumbnails, content).result()
+    except BrokenProcessPool:
+        with _pool_lock:
+            _pool = None
+        return render_thumbnails(content)
+
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from links.links_http_client import resolve_redirects
+from links.links_url_utils import clean_url, is_shortener
+from links.models import ResolvedUrl
+
+
+def cached_targets(urls):
+    """
+    Known targets of the shortener urls, one query for all of them
+    """
+    fresh_since = timezone.now() - timedelta(seconds=settings.LINKS_RESOLVED_URL_TTL)
+    return dict(ResolvedUrl.objects.filter(source__in=urls, resolved_at__gte=fresh_since).values_list('source', 'target'))
+
+
+def remember_targets(targets):
+    """
+    Storing the targets of shortener urls, targets maps the source urls to their targets
+    """
+    now = timezone.now()
+    for source, target in targets.items():
+        ResolvedUrl.objects.update_or_create(source=source, defaults={'target': target, 'resolved_at': now})
+
+
+def canonicalize_url(url, resolve=True):
+    """
+    Canonical url used for duplicate detection, the metadata cache and fetching: the clean url,
+    for a known shortener its redirect target. Unknown targets are resolved over the network
+    only when resolve is set, otherwise the clean shortener url is returned
+    """
+    url = clean_url(url)
+    if not is_shortener(url):
+        return url
+    target = cached_targets([url]).get(url)
+    if target is None and resolve:
+        target = clean_url(resolve_redirects(url))
+        remember_targets({url: target})
+    return target or url
+
+
+def canonicalize_urls(urls):
+    """
+    Canonical urls without network access, urls maps each submitted url to its canonical one
+    """
+    cleaned = {url: clean_url(url) for url in urls}
+    targets = cached_targets([url for url in cleaned.values() if is_shortener(url)])
+    return {url: targets.get(clean, clean) for url, clean in cleaned.items()}
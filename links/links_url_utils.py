@@ -0,0 +1,92 @@
+import hashlib
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'ysclid', 'igshid',
+    'mc_cid', 'mc_eid', '_openstat', '_hsenc', '_hsmi', 'mkt_tok', 'ref_src', 'spm',
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'hsa_')
+
+SHORTENER_HOSTS = {
+    'bit.ly', 'bitly.com', 't.co', 'goo.gl', 'tinyurl.com', 'ow.ly', 'is.gd', 'buff.ly', 'cutt.ly',
+    'rebrand.ly', 't.ly', 'lnkd.in', 'youtu.be', 'clck.ru', 'vk.cc', 'surl.li', 'shorturl.at',
+}
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def query_params(query):
+    """
+    Raw name=value pieces of the query without the tracking parameters, the encoding is left as is
+    """
+    return [
+        param for param in query.split('&')
+        if param and not is_tracking_param(unquote_plus(param.split('=', 1)[0]))
+    ]
+
+
+def clean_url(url):
+    """
+    Fetchable canonical form of the url: lowercase scheme and host, no default port, no fragment,
+    no tracking parameters and '/' for an empty path
+    """
+    url = url.strip()
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if not host:
+        return url
+    if ':' in host:
+        # the brackets of an IPv6 literal are not part of hostname
+        host = f'[{host}]'
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, DEFAULT_PORTS.get(scheme)) else f'{host}:{port}'
+    if parts.username:
+        userinfo = parts.username + (f':{parts.password}' if parts.password else '')
+        netloc = f'{userinfo}@{netloc}'
+    return urlunsplit((scheme, netloc, parts.path or '/', '&'.join(query_params(parts.query)), ''))
+
+
+def normalize_url(url):
+    """
+    Identity of the url for duplicate detection, not a fetchable url: the clean url without the scheme,
+    the www. prefix and the trailing slash, with sorted query parameters.
+    http://www.example.com/a/?utm_source=x and https://example.com/a are the same link
+    """
+    parts = urlsplit(clean_url(url))
+    if not parts.netloc:
+        return url.strip()
+    netloc = parts.netloc.removeprefix('www.')
+    path = parts.path.rstrip('/')
+    query = '&'.join(sorted(query_params(parts.query)))
+    return f'{netloc}{path}?{query}' if query else f'{netloc}{path}'
+
+
+def url_hash(url):
+    """
+    Hex digest of the normalized url, stored in UserLink.url_hash
+    """
+    return hashlib.sha256(normalize_url(url).encode()).hexdigest()
+
+
+def url_host(url):
+    """
+    Lowercase host of the url without the www. prefix, stored in UserLink.host
+    """
+    try:
+        host = urlsplit(url.strip()).hostname or ''
+    except ValueError:
+        return ''
+    return host.rstrip('.').removeprefix('www.')
+
+
+def is_shortener(url):
+    return url_host(url) in SHORTENER_HOSTS
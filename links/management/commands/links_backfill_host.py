@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from links.links_url_utils import url_host
+from links.models import UserLink
+
+
+class Command(BaseCommand):
+    """
+    Filling in UserLink.host of the links stored before the column existed
+    """
+    help = 'Compute the host of links that do not have one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        links = UserLink.objects.filter(host='').only('id', 'url').order_by('id')
+        filled = 0
+        batch = []
+        for link in links.iterator(chunk_size=options['batch_size']):
+            link.host = url_host(link.url)
+            if not link.host:
+                continue
+            batch.append(link)
+            if len(batch) >= options['batch_size']:
+                filled += UserLink.objects.bulk_update(batch, ['host'])
+                batch = []
+        filled += UserLink.objects.bulk_update(batch, ['host'])
+        self.stdout.write(f'Filled {filled} hosts')
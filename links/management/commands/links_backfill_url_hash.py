@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from links.links_url_utils import url_hash
+from links.models import UserLink
+
+
+class Command(BaseCommand):
+    """
+    Filling in UserLink.url_hash of the links stored before the column existed
+    or recomputing all hashes after a change of the url normalization
+    """
+    help = 'Compute the normalized url hash of links that do not have one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--all', action='store_true', help='Recompute the hashes of all links')
+
+    def handle(self, *args, **options):
+        links = UserLink.objects.only('id', 'user_id', 'url').order_by('id')
+        if options['all']:
+            # the old hashes may collide with the new ones, they are cleared before recomputing
+            UserLink.objects.update(url_hash=None)
+            taken = set()
+        else:
+            taken = set(UserLink.objects.filter(url_hash__isnull=False).values_list('user_id', 'url_hash'))
+            links = links.filter(url_hash__isnull=True)
+        filled = duplicates = 0
+        batch = []
+        for link in links.iterator(chunk_size=options['batch_size']):
+            key = (link.user_id, url_hash(link.url))
+            if key in taken:
+                # an older duplicate of the same url, left without hash for manual cleanup
+                duplicates += 1
+                continue
+            taken.add(key)
+            link.url_hash = key[1]
+            batch.append(link)
+            if len(batch) >= options['batch_size']:
+                filled += UserLink.objects.bulk_update(batch, ['url_hash'])
+                batch = []
+        filled += UserLink.objects.bulk_update(batch, ['url_hash'])
+        self.stdout.write(f'Filled {filled} url hashes, {duplicates} duplicate links left without hash')
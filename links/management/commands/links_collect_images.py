@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from links.links_image_store import collect_unused_images
+
+
+class Command(BaseCommand):
+    """
+    Garbage collection of the content-addressed link pictures
+    """
+    help = 'Delete stored link pictures that no link has used for the grace period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-period', type=int, default=3600, help='Seconds a picture stays unused')
+
+    def handle(self, *args, **options):
+        deleted = collect_unused_images(timedelta(seconds=options['grace_period']))
+        self.stdout.write(f'Deleted {deleted} unused pictures')
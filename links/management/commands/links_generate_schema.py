@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.schema import write_schema
+
+
+class Command(BaseCommand):
+    """
+    Generating the OpenAPI schema on deploy, the processes serve it from the file without introspecting the views
+    """
+    help = 'Write the OpenAPI schema to API_SCHEMA_FILE'
+
+    def handle(self, *args, **options):
+        version = write_schema(settings.API_SCHEMA_FILE)
+        self.stdout.write(f'Wrote the schema version {version} to {settings.API_SCHEMA_FILE}')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from links.links_metadata_cache import metadata_cache
+
+
+class Command(BaseCommand):
+    """
+    Showing the hit ratio of the page metadata cache shared between users to tune its TTL and size
+    """
+    help = 'Show the page metadata cache hits, misses and size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after showing them')
+
+    def handle(self, *args, **options):
+        stats = metadata_cache.stats()
+        self.stdout.write(
+            f'{stats["hits"]} hits, {stats["misses"]} misses, hit ratio {stats["hit_ratio"]:.1%}, '
+            f'{stats["size"]} cached pages'
+        )
+        if options['reset']:
+            metadata_cache.reset_stats()
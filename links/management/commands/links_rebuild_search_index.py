@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from links.links_search import rebuild_search_index, search_available
+from links.models import UserLink
+
+
+class Command(BaseCommand):
+    """
+    Recreating the full-text search index of the links, the index is created by migrate
+    and kept in sync by triggers, a rebuild is only needed after restoring a database or a schema change
+    """
+    help = 'Rebuild the full-text search index of the links'
+
+    def handle(self, *args, **options):
+        if not search_available():
+            raise CommandError('The full-text search index is only available on SQLite')
+        rebuild_search_index()
+        self.stdout.write(f'Indexed {UserLink.objects.count()} links')
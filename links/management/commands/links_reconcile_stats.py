@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from links.links_stats import reconcile_link_type_counts
+
+
+class Command(BaseCommand):
+    """
+    Recounting the per user link type counters from the links, nightly or after manual database changes
+    """
+    help = 'Recount the per user link type counters and report the drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report the drift without fixing the counters')
+
+    def handle(self, *args, **options):
+        drift = reconcile_link_type_counts(dry_run=options['dry_run'])
+        for (user_id, link_type), (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f'user {user_id} {link_type!r}: stored {stored}, actual {actual}')
+        action = 'Found' if options['dry_run'] else 'Fixed'
+        self.stdout.write(f'{action} {len(drift)} drifted counters')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from links.links_report import rebuild_link_report, refresh_link_report
+
+
+class Command(BaseCommand):
+    """
+    Refreshing the top users report from the change log, every few minutes on a schedule
+    """
+    help = 'Apply the link count changes to the top users report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recount the report from the links')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rebuild_link_report()
+            self.stdout.write('Rebuilt the report')
+        else:
+            self.stdout.write(f'Applied {refresh_link_report()} changes')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from links.links_response_cache import reset_response_cache_stats, response_cache_stats
+from links.routers import user_link_collection_router, user_link_router
+from links.views import CachedResponseViewMixin
+
+
+class Command(BaseCommand):
+    """
+    Showing the hit ratio of the response cache per endpoint to tune its backend and timeout
+    """
+    help = 'Show the response cache hits and misses per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after showing them')
+
+    def handle(self, *args, **options):
+        endpoints = [
+            f'{basename}-{action}'
+            for router in (user_link_router, user_link_collection_router)
+            for prefix, viewset, basename in router.registry
+            if issubclass(viewset, CachedResponseViewMixin)
+            for action in viewset.cached_actions
+        ]
+        for endpoint, stats in response_cache_stats(endpoints).items():
+            self.stdout.write(
+                f'{endpoint}: {stats["hits"]} hits, {stats["misses"]} misses, hit ratio {stats["hit_ratio"]:.1%}'
+            )
+        if options['reset']:
+            reset_response_cache_stats(endpoints)
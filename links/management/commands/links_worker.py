@@ -0,0 +1,89 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from links.links_ingest_utils import claim_ingest_job, process_ingest_job, requeue_stale_jobs
+
+# seconds a worker waits at most before claiming again after the claims failed
+CLAIM_RETRY_MAX_WAIT = 30
+
+
+class Command(BaseCommand):
+    """
+    Worker pool that processes the queued link ingestion jobs
+    """
+    help = 'Fetch metadata of pending links in a local pool of worker threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.LINKS_INGEST_WORKERS)
+        parser.add_argument('--poll-interval', type=float, default=settings.LINKS_INGEST_POLL_INTERVAL)
+        parser.add_argument('--stale-after', type=int, default=settings.LINKS_INGEST_STALE_AFTER,
+                            help='Seconds after which a running job is considered abandoned')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=options['stale_after'])
+        self.requeue(stale_after)
+
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self.work, args=(stop, options['poll_interval'], options['once']), daemon=True)
+            for _ in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            # the jobs left running by a failed write or a dead worker are requeued while the pool runs
+            next_requeue = time.monotonic() + options['stale_after']
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+                if time.monotonic() >= next_requeue:
+                    self.requeue(stale_after)
+                    next_requeue = time.monotonic() + options['stale_after']
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping workers...')
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def requeue(self, stale_after):
+        close_old_connections()
+        try:
+            requeued = requeue_stale_jobs(stale_after)
+        except DatabaseError as e:
+            self.stderr.write(f'Requeueing the abandoned jobs failed: {e}')
+            return
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} abandoned jobs')
+
+    def work(self, stop, poll_interval, once):
+        failures = 0
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                job = claim_ingest_job()
+            except DatabaseError as e:
+                # "database is locked" under SQLite, the wait doubles with every failed claim in a row
+                wait = min(max(poll_interval, 0.1) * 2 ** failures, CLAIM_RETRY_MAX_WAIT)
+                failures = min(failures + 1, 16)
+                self.stderr.write(f'Claiming a job failed, retrying in {wait:g}s: {e}')
+                stop.wait(wait)
+                continue
+            failures = 0
+            if job is None:
+                if once:
+                    break
+                stop.wait(poll_interval)
+                continue
+            try:
+                job = process_ingest_job(job)
+            except Exception as e:
+                self.stderr.write(f'Link {job.link_id}: {e}')
+                continue
+            self.stdout.write(f'Link {job.link_id}: {job.status} {job.error}'.rstrip())
+        close_old_connections()
@@ -1,7 +1,8 @@
-from PIL import Image
 from django.db import models
 from django.utils import timezone
 
+from core.db import write_atomic
+from links.links_url_utils import url_hash, url_host
 from users.models import CustomUser
 
 
@@ -9,6 +10,15 @@ class UserLink(models.Model):
     """
     User link model
     """
+    STATUS_PENDING = 'pending'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_READY, 'Ready'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     title = models.CharField(max_length=100)
     description = models.CharField(max_length=1000)
@@ -17,17 +27,36 @@ class UserLink(models.Model):
     link_type = models.CharField(max_length=100)
     creation_date = models.DateTimeField(default=timezone.now, blank=True)
     change_date = models.DateTimeField(default=timezone.now, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_READY)
+    url_hash = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    host = models.CharField(max_length=255, blank=True, default='', editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'url_hash'], name='links_userlink_unique_user_url_hash'),
+        ]
+        # keyset pagination of the links list by either date, alone or after a link_type or host filter,
+        # see links.pagination and links.filters
+        indexes = [
+            models.Index(fields=['user', '-change_date', '-id'], name='links_userlink_user_changed'),
+            models.Index(fields=['user', '-creation_date', '-id'], name='links_userlink_user_created'),
+            models.Index(fields=['user', 'link_type', '-change_date', '-id'], name='links_userlink_type_changed'),
+            models.Index(fields=['user', 'link_type', '-creation_date', '-id'], name='links_userlink_type_created'),
+            models.Index(fields=['user', 'host', '-change_date', '-id'], name='links_userlink_host_changed'),
+            models.Index(fields=['user', 'host', '-creation_date', '-id'], name='links_userlink_host_created'),
+        ]
 
     def save(self, *args, **kwargs):
+        # thumbnails are rendered by the picture store when a new picture is stored, see links.signals
         self.change_date = timezone.now()
-        super().save(*args, **kwargs)
-        if not self.image:
+        if 'url' in self.__dict__:
+            self.url_hash = url_hash(self.url)
+            self.host = url_host(self.url)
+        if 'image' in self.__dict__ and not self.image:
             self.image = 'static/default.png'
-        img = Image.open(self.image.path)
-        if img.height > 300 or img.width > 300:
-            output_size = (300, 300)
-            img.thumbnail(output_size)
-            img.save(self.image.path)
+        # the picture references and the link type counters are changed by the signals in the same transaction
+        with write_atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -44,9 +73,157 @@ class UserLinkCollection(models.Model):
     creation_date = models.DateTimeField(default=timezone.now, blank=True)
     change_date = models.DateTimeField(default=timezone.now, blank=True)
 
+    class Meta:
+        indexes = [
+            # keyset pagination of the collections list, see links.pagination
+            models.Index(fields=['user', '-creation_date', '-id'], name='links_collection_user_created'),
+            # change stamps of the conditional GET, see links.links_conditional
+            models.Index(fields=['user', '-change_date', '-id'], name='links_collection_user_changed'),
+        ]
+
     def save(self, *args, **kwargs):
         self.change_date = timezone.now()
         super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
+
+
+class LinkIngestJob(models.Model):
+    """
+    Background job that fetches the page of a pending user link and fills in its metadata
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    link = models.OneToOneField(UserLink, on_delete=models.CASCADE, related_name='ingest_job')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    creation_date = models.DateTimeField(default=timezone.now, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.link_id}: {self.status}'
+
+
+class LinkMetadata(models.Model):
+    """
+    Page metadata shared by all users who save the same url
+    """
+    url = models.CharField(max_length=2000, unique=True)
+    title = models.CharField(max_length=100, blank=True)
+    description = models.CharField(max_length=1000, blank=True)
+    og_url = models.CharField(max_length=2000, blank=True)
+    link_type = models.CharField(max_length=100, blank=True)
+    image_url = models.CharField(max_length=2000, blank=True)
+    image = models.CharField(max_length=255, blank=True)
+    fetched_at = models.DateTimeField(null=True, blank=True)
+    fetching_since = models.DateTimeField(null=True, blank=True)
+    last_used = models.DateTimeField(default=timezone.now, db_index=True)
+    hits = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.url
+
+
+class LinkImage(models.Model):
+    """
+    Link picture stored once by the hash of its content and shared by every link that points to it
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    creation_date = models.DateTimeField(default=timezone.now, blank=True)
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ResolvedUrl(models.Model):
+    """
+    Target of a shortener link, kept so that the redirect is followed only once
+    """
+    source = models.CharField(max_length=2000, unique=True)
+    target = models.CharField(max_length=2000)
+    resolved_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.source} -> {self.target}'
+
+
+class UserLinkTypeCount(models.Model):
+    """
+    Number of links of every type per user, kept up to date by links.signals
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='link_type_counts')
+    link_type = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'link_type'], name='links_typecount_unique_user_type'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} {self.link_type}: {self.count}'
+
+
+class LinkCountChange(models.Model):
+    """
+    Change log of the link counts per user, type and creation day, consumed by links.links_report.
+    Rows of deleted users are written while the user is being deleted, so the user is not a constraint
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    link_type = models.CharField(max_length=100, blank=True)
+    day = models.DateField()
+    delta = models.IntegerField()
+
+
+class UserLinkDailyCount(models.Model):
+    """
+    Number of links of every type per user and creation day, the top users report over a date window
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='link_daily_counts')
+    day = models.DateField()
+    link_type = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day', 'link_type'], name='links_dailycount_unique_user_day_type'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'user', 'count'], name='links_dailycount_day_user'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} {self.day} {self.link_type}: {self.count}'
+
+
+class UserLinkTotal(models.Model):
+    """
+    Number of links per user with the registration date, the all time top users report is read in index order
+    """
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='link_total')
+    total = models.IntegerField(default=0)
+    date_joined = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-total', 'date_joined', 'user'], name='links_total_top'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.total}'
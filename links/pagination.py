@@ -0,0 +1,148 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination on a (field, id) key. The cursor holds the key of the last row of the page and the next
+    page is a range query on the matching composite index, so every page costs the same and no OFFSET or COUNT
+    is ever run. The ordering is a pair like ('-change_date', '-id') with the same direction on both fields,
+    or the id alone
+    """
+    ordering = ('-id',)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset for the async views, the page is read through the async ORM
+        """
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset])
+
+    def page_queryset(self, queryset, request, view=None):
+        """
+        The rows of the page and the one after it, in the index order of the page
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor.reverse if self.cursor else False
+
+        field = self.ordering[0].lstrip('-')
+        descending = self.ordering[0].startswith('-')
+        # a previous page walks the index the other way and is flipped afterwards
+        forward_descending = descending != reverse
+        key = (field, 'id') if field != 'id' else ('id',)
+        queryset = queryset.order_by(*(f'-{name}' if forward_descending else name for name in key))
+
+        if self.cursor and self.cursor.position:
+            value, pk = self._decode_position(queryset.model, field, self.cursor.position)
+            lookup = 'lt' if forward_descending else 'gt'
+            queryset = queryset.filter(Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'id__{lookup}': pk}))
+
+        self._field = field
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        reverse = self.cursor.reverse if self.cursor else False
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = bool(self.cursor and self.cursor.position)
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self._position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self._position(self.page[0])))
+
+    def _position(self, row):
+        value = row[self._field] if isinstance(row, dict) else getattr(row, self._field)
+        pk = row['id'] if isinstance(row, dict) else row.id
+        value = value.isoformat() if hasattr(value, 'isoformat') else value
+        return f'{value}|{pk}'
+
+    def _decode_position(self, model, field, position):
+        try:
+            value, pk = position.rsplit('|', 1)
+            return model._meta.get_field(field).to_python(value), int(pk)
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class UserLinkPagination(KeysetCursorPagination):
+    ordering = ('-change_date', '-id')
+
+
+class UserLinkCollectionPagination(KeysetCursorPagination):
+    ordering = ('-creation_date', '-id')
+
+
+class RankedCursorPagination(KeysetCursorPagination):
+    """
+    Cursor pagination of full-text search results on the (rank, id) key, the id orders the links
+    of equal rank so that none is skipped or repeated between pages
+    """
+    ordering = ('rank', 'id')
+
+    def paginate_search(self, search, request):
+        """
+        search(position, reverse, limit) returns the (id, rank) rows past the position, nearest first
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor.reverse if self.cursor else False
+        position = self._decode_rank(self.cursor.position) if self.cursor and self.cursor.position else None
+
+        rows = search(position, reverse, self.page_size + 1)
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return [pk for pk, rank in self.page]
+
+    def _position(self, row):
+        pk, rank = row
+        return f'{rank!r}|{pk}'
+
+    def _decode_rank(self, position):
+        try:
+            rank, pk = position.rsplit('|', 1)
+            return float(rank), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
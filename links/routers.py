@@ -79,7 +79,7 @@ class CustomUserLinkCollectionRouter(SimpleRouter):
             initkwargs={'suffix': 'Instance'}
         ),
         DynamicRoute(
-            url=r'^{prefix}/{lookup}{trailing_slash}$',
+            url=r'^{prefix}/{lookup}/{url_path}{trailing_slash}$',
             name='{basename}-{url_name}',
             detail=True,
             initkwargs={}
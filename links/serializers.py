@@ -1,21 +1,125 @@
 from rest_framework import serializers
 
+from links.links_image_store import thumbnail_names
 from links.models import UserLink, UserLinkCollection
 
+SUMMARY_VIEW = 'summary'
 
-class UserLinkSerializer(serializers.ModelSerializer):
+
+def split_fields(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def selected_fields(request, serializer_class):
+    """
+    Fields of the serializer asked for by the request: ?view=summary gives Meta.summary_fields,
+    ?fields= lists the fields to keep and ?omit= the fields to drop
+    """
+    fields = serializer_class.Meta.fields
+    params = request.query_params
+    if params.get('view') == SUMMARY_VIEW:
+        selected = serializer_class.Meta.summary_fields
+    elif 'fields' in params:
+        selected = split_fields(params['fields'])
+    else:
+        selected = fields
+    omitted = split_fields(params.get('omit', ''))
+
+    unknown = (set(selected) | set(omitted)) - set(fields)
+    if unknown:
+        raise serializers.ValidationError({'fields': [f'Unknown fields: {", ".join(sorted(unknown))}']})
+    return tuple(name for name in fields if name in selected and name not in omitted)
+
+
+def expanded_fields(request, serializer_class):
+    """
+    Related objects to embed asked for by ?expand=, out of Meta.expandable_fields
+    """
+    expandable = getattr(serializer_class.Meta, 'expandable_fields', {})
+    expanded = split_fields(request.query_params.get('expand', ''))
+    unknown = set(expanded) - set(expandable)
+    if unknown:
+        raise serializers.ValidationError({'expand': [f'Unknown fields: {", ".join(sorted(unknown))}']})
+    return tuple(name for name in expandable if name in expanded)
+
+
+class SparseFieldsMixin:
+    """
+    Dropping the fields not asked for by ?fields=, ?omit= or ?view=summary from the output of GET requests
+    and adding the related objects asked for by ?expand=
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None and request.method == 'GET':
+            selected = selected_fields(request, self.__class__)
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+            for name in expanded_fields(request, self.__class__):
+                serializer_class, field_kwargs = self.Meta.expandable_fields[name]
+                self.fields[name] = serializer_class(**field_kwargs)
+
+
+class ThumbnailsField(serializers.Field):
+    """
+    Urls of the size variants of the stored link picture by size and format,
+    {"300": {"webp": url, "jpg": url}, "150": ..., "64": ...}. null for the pictures without variants
+    """
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        # the picture of a model instance or its name in a values() row
+        variants = thumbnail_names(getattr(value, 'name', value))
+        if variants is None:
+            return None
+        storage = UserLink._meta.get_field('image').storage
+        request = self.context.get('request')
+
+        def url(name):
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return {
+            str(size): {extension: url(name) for extension, name in names.items()}
+            for size, names in variants.items()
+        }
+
+
+class UserLinkSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     User link serializer
     """
+    thumbnails = ThumbnailsField(source='image')
+
+    class Meta:
+        model = UserLink
+        fields = (
+            'id', 'user', 'title', 'description', 'url', 'image', 'thumbnails', 'link_type', 'creation_date',
+            'change_date', 'status',
+        )
+        summary_fields = ('id', 'title', 'url', 'image')
+        read_only_fields = ('status',)
+
+
+class UserLinkSummarySerializer(serializers.ModelSerializer):
+    """
+    Short user link embedded into collections
+    """
     class Meta:
         model = UserLink
-        fields = ('id', 'user', 'title', 'description', 'url', 'image', 'link_type', 'creation_date', 'change_date')
+        fields = UserLinkSerializer.Meta.summary_fields
 
 
-class UserLinkCollectionSerializer(serializers.ModelSerializer):
+class UserLinkCollectionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     User link collections serializer
     """
     class Meta:
         model = UserLinkCollection
         fields = ('id', 'user', 'title', 'description', 'user_links', 'creation_date', 'change_date')
+        summary_fields = ('id', 'title')
+        expandable_fields = {
+            'links': (UserLinkSummarySerializer, {'source': 'user_links', 'many': True, 'read_only': True}),
+        }
@@ -0,0 +1,111 @@
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from links.links_image_store import acquire_image, release_image, store_image
+from links.links_response_cache import bump_user_version
+from links.links_stats import link_day, record_link_changes
+from links.models import UserLink, UserLinkCollection
+
+
+@receiver(post_init, sender=UserLink)
+def remember_loaded_image(sender, instance, **kwargs):
+    # read the raw value, the image descriptor would load a deferred field from the database
+    image = instance.__dict__.get('image')
+    instance._loaded_image = getattr(image, 'name', image)
+    instance._loaded_link_type = instance.__dict__.get('link_type')
+    instance._loaded_creation_date = instance.__dict__.get('creation_date')
+
+
+@receiver(pre_save, sender=UserLink)
+def store_uploaded_image(sender, instance, **kwargs):
+    """
+    Uploaded pictures go to the content-addressed store like the downloaded ones
+    """
+    if instance.image and not instance.image._committed:
+        instance.image.open('rb')
+        instance.image = store_image(instance.image.read())
+
+
+@receiver(pre_save, sender=UserLink)
+@receiver(pre_delete, sender=UserLink)
+def load_counted_fields(sender, instance, signal, **kwargs):
+    # fields deferred when the link was loaded, the stored values are needed to move the counters
+    counted = instance.__dict__.keys() & {'link_type', 'creation_date'}
+    if not instance.pk or (signal is pre_save and not counted):
+        return
+    missing = [] if 'user_id' in instance.__dict__ else ['user_id']
+    if instance._loaded_link_type is None:
+        missing.append('link_type')
+    if instance._loaded_creation_date is None:
+        missing.append('creation_date')
+    if not missing:
+        return
+    stored = UserLink.objects.filter(pk=instance.pk).values(*missing).first() or {}
+    instance.__dict__.setdefault('user_id', stored.get('user_id'))
+    instance._loaded_link_type = stored.get('link_type', instance._loaded_link_type)
+    instance._loaded_creation_date = stored.get('creation_date', instance._loaded_creation_date)
+
+
+def counted_key(user_id, link_type, creation_date):
+    return user_id, link_type, link_day(creation_date)
+
+
+@receiver(post_save, sender=UserLink)
+def count_link_types(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Moving the link between the per user link type counters and the daily counts of the report
+    """
+    if update_fields is not None and not {'link_type', 'creation_date'} & set(update_fields):
+        return
+    link_type = instance.__dict__.get('link_type', instance._loaded_link_type)
+    creation_date = instance.__dict__.get('creation_date', instance._loaded_creation_date)
+    if link_type is None or creation_date is None:
+        return
+    key = counted_key(instance.user_id, link_type, creation_date)
+    if created:
+        record_link_changes({key: 1})
+    else:
+        loaded = counted_key(instance.user_id, instance._loaded_link_type, instance._loaded_creation_date)
+        if key != loaded:
+            record_link_changes({loaded: -1, key: 1})
+    instance._loaded_link_type = link_type
+    instance._loaded_creation_date = creation_date
+
+
+@receiver(post_save, sender=UserLink)
+def count_image_references(sender, instance, created, **kwargs):
+    if 'image' not in instance.__dict__:
+        return
+    if created or instance.image.name != instance._loaded_image:
+        acquire_image(instance.image.name)
+        if not created:
+            release_image(instance._loaded_image)
+        instance._loaded_image = instance.image.name
+
+
+@receiver(post_delete, sender=UserLink)
+def release_deleted_image(sender, instance, **kwargs):
+    release_image(instance._loaded_image)
+
+
+@receiver(post_delete, sender=UserLink)
+def uncount_deleted_link(sender, instance, **kwargs):
+    if instance._loaded_link_type is not None and instance._loaded_creation_date is not None:
+        record_link_changes({
+            counted_key(instance.user_id, instance._loaded_link_type, instance._loaded_creation_date): -1,
+        })
+
+
+@receiver(post_save, sender=UserLink)
+@receiver(post_delete, sender=UserLink)
+@receiver(post_save, sender=UserLinkCollection)
+@receiver(post_delete, sender=UserLinkCollection)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    bump_user_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=UserLinkCollection.user_links.through)
+def invalidate_cached_collections(sender, instance, action, **kwargs):
+    # instance is the collection or, for the changes made from the link side, the link
+    if action.startswith('post_'):
+        bump_user_version(instance.user_id)
@@ -1,22 +1,41 @@
-import os
-
-import requests
-from bs4 import BeautifulSoup
-import urllib.request
-
-from django.core.files import File
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError
+from django.db.models import Prefetch
 from drf_yasg import openapi
 from drf_yasg.inspectors import SwaggerAutoSchema
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.status import HTTP_201_CREATED, HTTP_200_OK
+from rest_framework.status import HTTP_201_CREATED, HTTP_200_OK, HTTP_202_ACCEPTED, HTTP_400_BAD_REQUEST
 
+from core.db import write_atomic
+from links.filters import DATE_FILTERS, UserLinkFilterBackend
 from links.models import UserLink, UserLinkCollection
-from links.serializers import UserLinkSerializer, UserLinkCollectionSerializer
-
-from links.links_create_utils import cookies, headers
+from links.pagination import RankedCursorPagination, UserLinkCollectionPagination, UserLinkPagination
+from links.serializers import UserLinkSerializer, UserLinkCollectionSerializer, expanded_fields, selected_fields
+
+from links.links_bulk_import import import_links, parse_bookmarks
+from links.links_collection_utils import OPERATIONS, change_collection_links, owned_link_ids
+from links.links_conditional import change_stamp, conditional_response
+from links.links_response_cache import cache_response, get_cached_response
+from links.links_fast_serializers import ValuesSerializer
+from links.links_search import match_expression, search_link_ids
+from links.links_url_resolver import canonicalize_url
+from links.links_ingest_utils import (
+    DUPLICATE_LINK_MESSAGE,
+    create_link,
+    enqueue_link,
+    get_link_metadata,
+    link_exists,
+)
+from users.authentication import StatelessJWTAuthentication
 
 
 class CustomAutoSchema(SwaggerAutoSchema):
@@ -31,6 +50,54 @@ class CustomAutoSchema(SwaggerAutoSchema):
         return tags
 
 
+def sparse_fields_parameters():
+    return [
+        openapi.Parameter('fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          description='Comma separated fields to return'),
+        openapi.Parameter('omit', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          description='Comma separated fields to leave out'),
+        openapi.Parameter('view', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['summary'],
+                          description='Compact representation for lists'),
+    ]
+
+
+def link_filter_parameters():
+    return [
+        openapi.Parameter('link_type', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          description='Link type, several types are separated by commas'),
+        openapi.Parameter('host', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          description='Site of the links, www. is ignored'),
+    ] + [
+        openapi.Parameter(name, openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME,
+                          description='ISO 8601 date or datetime')
+        for name in DATE_FILTERS
+    ]
+
+
+def expand_parameters():
+    return [
+        openapi.Parameter('expand', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['links'],
+                          description='Embed the summaries of the collection links'),
+    ]
+
+
+def paginated_response(responses):
+    """
+    Wrapping the item schema of the responses into a page of the cursor pagination
+    """
+    return {
+        status: openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "next": openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI, x_nullable=True),
+                "previous": openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI, x_nullable=True),
+                "results": openapi.Schema(type=openapi.TYPE_ARRAY, items=schema),
+            }
+        )
+        for status, schema in responses.items()
+    }
+
+
 def links_list_retrieve_response():
     return {
             HTTP_200_OK: openapi.Schema(
@@ -42,9 +109,20 @@ def links_list_retrieve_response():
                         "description": openapi.Schema(type=openapi.TYPE_STRING),
                         "url": openapi.Schema(type=openapi.TYPE_STRING),
                         "image": openapi.Schema(type=openapi.TYPE_STRING),
+                        "thumbnails": openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            additional_properties=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                additional_properties=openapi.Schema(type=openapi.TYPE_STRING,
+                                                                     format=openapi.FORMAT_URI),
+                            ),
+                            x_nullable=True,
+                            description='Picture urls by size (300, 150, 64) and format (webp, and jpg or png)'
+                        ),
                         "link_type": openapi.Schema(type=openapi.TYPE_STRING),
                         "creation_date": openapi.Schema(type=openapi.TYPE_STRING),
                         "change_date": openapi.Schema(type=openapi.TYPE_STRING),
+                        "status": openapi.Schema(type=openapi.TYPE_STRING),
                 }
             )
         }
@@ -63,6 +141,19 @@ def link_collections_list_retrieve_response():
                         type=openapi.TYPE_ARRAY,
                         items=openapi.Schema(type=openapi.TYPE_INTEGER)
                     ),
+                    "links": openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                "id": openapi.Schema(type=openapi.TYPE_INTEGER),
+                                "title": openapi.Schema(type=openapi.TYPE_STRING),
+                                "url": openapi.Schema(type=openapi.TYPE_STRING),
+                                "image": openapi.Schema(type=openapi.TYPE_STRING),
+                            }
+                        ),
+                        description='With ?expand=links'
+                    ),
                     "creation_date": openapi.Schema(type=openapi.TYPE_STRING),
                     "change_date": openapi.Schema(type=openapi.TYPE_STRING),
                 }
@@ -70,21 +161,136 @@ def link_collections_list_retrieve_response():
         }
 
 
-class UserLinkAPIViewSet(viewsets.ModelViewSet):
+class SparseFieldsViewMixin:
+    """
+    Loading only the columns of the fields asked for by ?fields=, ?omit= or ?view=summary
+    """
+    def narrow_queryset(self, queryset):
+        if self.request.method != 'GET':
+            return queryset
+        serializer_class = self.get_serializer_class()
+        fields = selected_fields(self.request, serializer_class)
+        if fields == serializer_class.Meta.fields:
+            return queryset
+        # the declared fields read a column of another name
+        sources = [getattr(serializer_class._declared_fields.get(name), 'source', None) or name for name in fields]
+        columns = [name for name in sources if not queryset.model._meta.get_field(name).many_to_many]
+        if self.paginator is not None:
+            # the pagination key of the requested ordering is read from the rows to build the cursors
+            columns.append(self.paginator.get_ordering(self.request, queryset, self)[0].lstrip('-'))
+        return queryset.only('id', *columns)
+
+
+class FastReadViewMixin:
+    """
+    Serving list and retrieve from values() rows through ValuesSerializer, the output is the same
+    as the one of the model serializer. Turned off with LINKS_FAST_SERIALIZATION
+    """
+    def list(self, request, *args, **kwargs):
+        if not settings.LINKS_FAST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+        serializer = ValuesSerializer(self.get_serializer())
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is None:
+            return Response(serializer.serialize(serializer.values(queryset)))
+        # the pagination key is read from the rows to build the cursors
+        ordering = self.paginator.get_ordering(request, queryset, self)[0].lstrip('-')
+        page = self.paginate_queryset(serializer.values(queryset, ordering))
+        return self.get_paginated_response(serializer.serialize(page))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.LINKS_FAST_SERIALIZATION:
+            return super().retrieve(request, *args, **kwargs)
+        serializer = ValuesSerializer(self.get_serializer())
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return Response(serializer.serialize([row])[0])
+
+
+class CachedResponseViewMixin:
+    """
+    Serving list and retrieve from the per user response cache, the entries are invalidated
+    by the link and collection signals, see links.links_response_cache
+    """
+    cached_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(request, super().retrieve, *args, **kwargs)
+
+    def cached(self, request, respond, *args, **kwargs):
+        response = get_cached_response(request, f'{self.basename}-{self.action}')
+        if response is not None:
+            return response
+        response = respond(request, *args, **kwargs)
+        if response.status_code == 200:
+            # rendered here to store the content, the second finalize_response of dispatch changes nothing
+            response = self.finalize_response(request, response, *args, **kwargs)
+            response.render()
+            cache_response(request, response)
+        return response
+
+
+class ConditionalGetViewMixin:
+    """
+    ETag and Last-Modified of list and retrieve from the change stamps of the user rows,
+    an unchanged poll is answered with 304 without loading or serializing the rows
+    """
+    def change_stamps(self, queryset):
+        return (change_stamp(queryset),)
+
+    def list(self, request, *args, **kwargs):
+        def respond():
+            return super(ConditionalGetViewMixin, self).list(request, *args, **kwargs)
+
+        stamps = self.change_stamps(self.filter_queryset(self.get_queryset()))
+        return conditional_response(request, stamps, respond, use_last_modified=False)
+
+    def retrieve(self, request, *args, **kwargs):
+        def respond():
+            return super(ConditionalGetViewMixin, self).retrieve(request, *args, **kwargs)
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            stamps = self.change_stamps(self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ))
+        except (TypeError, ValueError, DjangoValidationError):
+            stamps = None
+        if not stamps or not stamps[0][1]:
+            # an invalid or unknown id is answered with 404 by retrieve
+            return respond()
+        return conditional_response(request, stamps, respond, use_last_modified=True)
+
+
+class UserLinkAPIViewSet(CachedResponseViewMixin, ConditionalGetViewMixin, FastReadViewMixin, SparseFieldsViewMixin,
+                         viewsets.ModelViewSet):
     """
     Viewset for endpoints of user links
     """
     serializer_class = UserLinkSerializer
+    # request.user is the token user, only its id is used
+    authentication_classes = (StatelessJWTAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = UserLinkPagination
+    filter_backends = (UserLinkFilterBackend, OrderingFilter)
+    # the pagination key follows the ordering, every option has its indexes
+    ordering_fields = ('change_date', 'creation_date')
+    ordering = ('-change_date',)
     my_tags = ['Links']
 
     def get_queryset(self):
         user = self.request.user.id
-        return UserLink.objects.filter(user=user)
+        return self.narrow_queryset(UserLink.objects.filter(user=user))
 
     @swagger_auto_schema(
         operation_summary='Adding a link',
-        operation_description='Add a link to the user base',
+        operation_description='Add a link to the user base. With asynchronous ingestion enabled the link is stored '
+                              'as pending and 202 is returned, the status becomes ready or failed once the '
+                              'links worker has fetched the page',
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
@@ -103,80 +309,145 @@ class UserLinkAPIViewSet(viewsets.ModelViewSet):
                     "link_type": openapi.Schema(type=openapi.TYPE_STRING),
                     "image": openapi.Schema(type=openapi.TYPE_STRING),
                 }
-            )
+            ),
+            HTTP_202_ACCEPTED: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "id": openapi.Schema(type=openapi.TYPE_INTEGER),
+                    "status": openapi.Schema(type=openapi.TYPE_STRING),
+                }
+            ),
         }
     )
     def create(self, request, *args, **kwargs):
-        response = requests.get(
-            request.data['link'],
-            cookies=cookies,
-            headers=headers,
-        )
+        if settings.LINKS_ASYNC_INGESTION:
+            return self.create_pending(request)
 
         data = {'user_id': self.request.user.id}
+        link = canonicalize_url(request.data['link'])
+        if link_exists(data['user_id'], link):
+            return Response(DUPLICATE_LINK_MESSAGE)
+        metadata = get_link_metadata(link)
 
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        if soup.find("meta", property="og:title"):
-            title = soup.find("meta", property="og:title")['content']
-            data['title'] = title
-        elif soup.find('title'):
-            title = soup.find('title').text
-            data['title'] = title
-
-        if soup.find("meta", property="og:description"):
-            description = soup.find("meta", property="og:description")['content']
-            data['description'] = description
-        elif soup.find("meta", {'name': 'description'}):
-            description = soup.find("meta", {'name': 'description'})['content']
-            data['description'] = description
-        else:
-            data['description'] = 'no description'
-
-        if soup.find("meta", property="og:url"):
-            url = soup.find("meta", property="og:url")['content']
-            data['url'] = url
+        if link_exists(data['user_id'], metadata['url']):
+            return Response(DUPLICATE_LINK_MESSAGE)
         else:
-            data['url'] = request.data['link']
+            try:
+                create_link(data['user_id'], metadata)
+            except IntegrityError:
+                return Response(DUPLICATE_LINK_MESSAGE)
+            data.update(
+                title=metadata['title'],
+                description=metadata['description'],
+                url=metadata['url'],
+                link_type=metadata['link_type'],
+                image=metadata['image_url'],
+            )
+            return Response(data)
 
-        if soup.find("meta", property="og:type"):
-            link_type = soup.find("meta", property="og:type")['content']
-            data['link_type'] = link_type
-        else:
-            data['link_type'] = 'website'
+    def create_pending(self, request):
+        """
+        Storing the link as pending, its metadata is fetched later by the links worker
+        """
+        # shortener links are resolved by the worker, only the known targets are used here
+        link = canonicalize_url(request.data['link'], resolve=False)
+        if link_exists(self.request.user.id, link):
+            return Response(DUPLICATE_LINK_MESSAGE)
+        try:
+            with write_atomic():
+                link = enqueue_link(self.request.user.id, link)
+        except IntegrityError:
+            return Response(DUPLICATE_LINK_MESSAGE)
+        return Response({'id': link.id, 'status': link.status}, status=HTTP_202_ACCEPTED)
 
-        if soup.find("meta", property="og:image"):
-            image = soup.find("meta", property="og:image")['content']
-            data['image'] = image
+    @swagger_auto_schema(
+        operation_summary='Bulk links import',
+        operation_description='Add many links at once: a JSON list of urls or a Netscape bookmarks HTML file '
+                              'exported from a browser (multipart field "file"). Pages are fetched concurrently, '
+                              'the result of every url is reported. At most '
+                              f'{settings.LINKS_BULK_MAX_SYNC_URLS} urls are imported at once, with asynchronous '
+                              'ingestion the links are stored as pending and up to '
+                              f'{settings.LINKS_BULK_MAX_URLS} urls are accepted',
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'urls': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING)),
+            },
+        ),
+        responses={
+            HTTP_201_CREATED: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "results": openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                "url": openapi.Schema(type=openapi.TYPE_STRING),
+                                "status": openapi.Schema(type=openapi.TYPE_STRING),
+                                "id": openapi.Schema(type=openapi.TYPE_INTEGER),
+                                "error": openapi.Schema(type=openapi.TYPE_STRING),
+                            }
+                        )
+                    ),
+                }
+            )
+        }
+    )
+    @action(['post'], detail=False, parser_classes=[JSONParser, MultiPartParser, FormParser])
+    def bulk(self, request, *args, **kwargs):
+        if 'file' in request.FILES:
+            urls = parse_bookmarks(request.FILES['file'].read().decode('utf-8', errors='replace'))
         else:
-            data['image'] = 'https://i.postimg.cc/90WC7pzc/default.png'
+            urls = request.data.get('urls')
+            if not isinstance(urls, list):
+                return Response('A list of urls or a bookmarks file is required', status=HTTP_400_BAD_REQUEST)
+        # without the ingestion worker every page is downloaded within the request
+        max_urls = settings.LINKS_BULK_MAX_URLS if settings.LINKS_ASYNC_INGESTION else settings.LINKS_BULK_MAX_SYNC_URLS
+        if len(urls) > max_urls:
+            return Response(f'At most {max_urls} urls can be imported at once', status=HTTP_400_BAD_REQUEST)
 
-        pic_path = data['image'].split('/')[-1].removesuffix('.png').replace('.', '') + '.png'
-        urllib.request.urlretrieve(data['image'], pic_path)
+        results = import_links(self.request.user.id, urls)
+        return Response({'results': results}, status=HTTP_201_CREATED)
 
-        urls_querry = UserLink.objects.filter(user_id=self.request.user.id)
-        urls_list = []
-        for i in urls_querry.values('url'):
-            urls_list.append(i['url'])
-        if data['url'] in urls_list:
-            return Response('The link is already in the collection')
+    @swagger_auto_schema(
+        operation_summary='Links search',
+        operation_description='Full-text search in the titles, descriptions and urls of the user links, best matches '
+                              'first. All terms must match, a trailing * matches a prefix. The results are paginated '
+                              'with an opaque cursor like the links list',
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+                              description='Search terms'),
+        ] + sparse_fields_parameters(),
+        responses=paginated_response(links_list_retrieve_response())
+    )
+    @action(['get'], detail=False, filter_backends=())
+    def search(self, request, *args, **kwargs):
+        expression = match_expression(self.request.user.id, request.query_params.get('q', ''))
+        if expression is None:
+            return Response('A search query is required', status=HTTP_400_BAD_REQUEST)
+
+        paginator = RankedCursorPagination()
+        ids = paginator.paginate_search(
+            lambda position, reverse, limit: search_link_ids(expression, limit, position, reverse), request
+        )
+        links = UserLink.objects.filter(user=self.request.user.id, id__in=ids)
+        if settings.LINKS_FAST_SERIALIZATION:
+            serializer = ValuesSerializer(self.get_serializer())
+            found = {row['id']: row for row in serializer.values(links)}
+            data = serializer.serialize([found[pk] for pk in ids if pk in found])
         else:
-            with open(pic_path, 'rb') as img_file:
-                UserLink.objects.create(
-                    user_id=data['user_id'],
-                    title=data['title'],
-                    description=data['description'],
-                    url=data['url'],
-                    link_type=data['link_type'],
-                    image=File(img_file, name=pic_path)
-                )
-            os.remove(pic_path)
-            return Response(data)
+            found = self.narrow_queryset(links).in_bulk()
+            data = self.get_serializer([found[pk] for pk in ids if pk in found], many=True).data
+        return paginator.get_paginated_response(data)
 
     @swagger_auto_schema(
         operation_summary='Links list',
-        operation_description='Show all user links',
-        responses=links_list_retrieve_response()
+        operation_description='Show user links, newest changes first. The list is paginated with an opaque cursor: '
+                              'follow the next and previous links, page_size sets the page length. '
+                              'ordering is one of change_date, creation_date, -change_date, -creation_date',
+        manual_parameters=sparse_fields_parameters() + link_filter_parameters(),
+        responses=paginated_response(links_list_retrieve_response())
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
@@ -184,6 +455,7 @@ class UserLinkAPIViewSet(viewsets.ModelViewSet):
     @swagger_auto_schema(
         operation_summary='Link by id',
         operation_description='Show user link by id',
+        manual_parameters=sparse_fields_parameters(),
         responses=links_list_retrieve_response()
     )
     def retrieve(self, request, *args, **kwargs):
@@ -209,6 +481,13 @@ class UserLinkAPIViewSet(viewsets.ModelViewSet):
         request.data['user'] = self.request.user.id
         return super().update(request, *args, **kwargs)
 
+    def perform_update(self, serializer):
+        try:
+            with write_atomic():
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError({'url': [DUPLICATE_LINK_MESSAGE]})
+
     @swagger_auto_schema(
         operation_summary='Partial updating a link',
         operation_description='Partial update a link in the user base',
@@ -237,27 +516,27 @@ class UserLinkAPIViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class UserLinkCollectionAPIViewSet(viewsets.ModelViewSet):
+class UserLinkCollectionAPIViewSet(CachedResponseViewMixin, ConditionalGetViewMixin, FastReadViewMixin,
+                                   SparseFieldsViewMixin, viewsets.ModelViewSet):
     """
     Viewset for endpoints of user link collections
     """
     serializer_class = UserLinkCollectionSerializer
+    # request.user is the token user, only its id is used
+    authentication_classes = (StatelessJWTAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = UserLinkCollectionPagination
     my_tags = ['Link Collections']
 
+    def change_stamps(self, queryset):
+        # a collection shows its links, which change and are deleted without touching the collection
+        return change_stamp(queryset), change_stamp(UserLink.objects.filter(user=self.request.user.id))
+
     def user_links_code(self, request):
         user = self.request.user.id
-        link = UserLink.objects.filter(user_id=user)
-        user_links_list = []
-        for ul in link.values('id'):
-            user_links_list.append(ul['id'])
         user_links = request.data['user_links']
-        i = 0
-        while i < len(user_links):
-            if user_links[i] not in user_links_list:
-                del user_links[i]
-            else:
-                i += 1
+        # the links of other users are dropped from the request
+        user_links[:] = owned_link_ids(user, user_links)
         return user, user_links
 
     def get_data(self, request):
@@ -274,12 +553,24 @@ class UserLinkCollectionAPIViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user.id
-        return UserLinkCollection.objects.filter(user=user)
+        queryset = self.narrow_queryset(UserLinkCollection.objects.filter(user=user))
+        if self.request.method != 'GET':
+            return queryset
+        # the links of the whole page are loaded in one query instead of one per collection
+        if 'links' in expanded_fields(self.request, self.get_serializer_class()):
+            links = UserLink.objects.only(*UserLinkSerializer.Meta.summary_fields)
+        elif 'user_links' in selected_fields(self.request, self.get_serializer_class()):
+            links = UserLink.objects.only('id')
+        else:
+            return queryset
+        return queryset.prefetch_related(Prefetch('user_links', queryset=links.order_by('id')))
 
     @swagger_auto_schema(
         operation_summary='Collections list',
-        operation_description='Show all user collections',
-        responses=link_collections_list_retrieve_response()
+        operation_description='Show user collections, newest first. The list is paginated with an opaque cursor: '
+                              'follow the next and previous links, page_size sets the page length',
+        manual_parameters=sparse_fields_parameters() + expand_parameters(),
+        responses=paginated_response(link_collections_list_retrieve_response())
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
@@ -325,6 +616,7 @@ class UserLinkCollectionAPIViewSet(viewsets.ModelViewSet):
     @swagger_auto_schema(
         operation_summary='Collection by id',
         operation_description='Show user collection by id',
+        manual_parameters=sparse_fields_parameters() + expand_parameters(),
         responses=link_collections_list_retrieve_response()
     )
     def retrieve(self, request, *args, **kwargs):
@@ -350,8 +642,7 @@ class UserLinkCollectionAPIViewSet(viewsets.ModelViewSet):
         instance.user_id = data['user']
         instance.title = data['title']
         instance.description = data['description']
-        for ul in data['user_links']:
-            instance.user_links.add(ul)
+        instance.user_links.add(*data['user_links'])
         instance.save()
 
         return Response(data)
@@ -374,8 +665,7 @@ class UserLinkCollectionAPIViewSet(viewsets.ModelViewSet):
         instance = UserLinkCollection.objects.get(id=kwargs['pk'])
         if 'user_links' in request.data:
             part = self.user_links_code(request)
-            for ul in part[1]:
-                instance.user_links.add(ul)
+            instance.user_links.add(*part[1])
         if 'title' in request.data:
             instance.title = request.data['title']
         if 'description' in request.data:
@@ -384,6 +674,49 @@ class UserLinkCollectionAPIViewSet(viewsets.ModelViewSet):
 
         return Response(request.data)
 
+    @swagger_auto_schema(
+        operation_summary='Changing collection links',
+        operation_description='Add links to the collection, remove them from it or replace all of its links at once. '
+                              'Links of other users are ignored',
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "operation": openapi.Schema(type=openapi.TYPE_STRING, enum=OPERATIONS),
+                "links": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+            },
+            required=['operation', 'links']
+        ),
+        responses={
+            HTTP_200_OK: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "added": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                    "removed": openapi.Schema(type=openapi.TYPE_ARRAY,
+                                              items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                    "ignored": openapi.Schema(type=openapi.TYPE_ARRAY,
+                                              items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                }
+            )
+        }
+    )
+    @action(['post'], detail=True, url_path='links')
+    def links(self, request, *args, **kwargs):
+        operation = request.data.get('operation')
+        links = request.data.get('links')
+        if operation not in OPERATIONS:
+            return Response(f'The operation must be one of: {", ".join(OPERATIONS)}', status=HTTP_400_BAD_REQUEST)
+        if not isinstance(links, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in links):
+            return Response('A list of link ids is required', status=HTTP_400_BAD_REQUEST)
+        if len(links) > settings.LINKS_COLLECTION_MAX_LINKS:
+            return Response(f'At most {settings.LINKS_COLLECTION_MAX_LINKS} links can be changed at once',
+                            status=HTTP_400_BAD_REQUEST)
+
+        instance = self.get_object()
+        owned = owned_link_ids(self.request.user.id, links)
+        added, removed = change_collection_links(instance, operation, owned)
+        ignored = sorted(set(links) - set(owned))
+        return Response({'added': added, 'removed': removed, 'ignored': ignored})
+
     @swagger_auto_schema(
         operation_summary='Deleting a collection',
         operation_description='Delete a collection to group user links from the user base',
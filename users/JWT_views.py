@@ -1,6 +1,8 @@
 from drf_yasg.inspectors import SwaggerAutoSchema
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import serializers, status
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.views import (
     TokenBlacklistView,
     TokenObtainPairView,
@@ -8,6 +10,9 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,
 )
 
+from users.authentication import RevocableJWTAuthentication
+from users.token_revocation import revocation_filter
+
 
 class CustomAutoSchema(SwaggerAutoSchema):
     """
@@ -128,9 +133,27 @@ class DecoratedTokenBlacklistView(TokenBlacklistView):
     my_tags = ['Authentication']
 
     @swagger_auto_schema(
+        operation_summary='Blacklist token',
+        operation_description='Logging out: the refresh token is blacklisted and the access token '
+                              'of the Authorization header is revoked until it expires',
         responses={
             status.HTTP_200_OK: TokenBlacklistResponseSerializer,
         }
     )
     def post(self, request, *args, **kwargs):
-        return super().post(request, *args, **kwargs)
+        response = super().post(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            self.revoke_access_token(request)
+        return response
+
+    def revoke_access_token(self, request):
+        authentication = RevocableJWTAuthentication()
+        header = authentication.get_header(request)
+        raw_token = header and authentication.get_raw_token(header)
+        if not raw_token:
+            return
+        try:
+            token = AccessToken(raw_token)
+        except TokenError:
+            return
+        revocation_filter.revoke(token)
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
 
-from .models import CustomUser
+from .models import CustomUser, RevokedToken
 
 
 class CustomUserAdmin(UserAdmin):
@@ -30,4 +30,13 @@ class CustomUserAdmin(UserAdmin):
     filter_horizontal = ('groups', 'user_permissions',)
 
 
+class RevokedTokenAdmin(admin.ModelAdmin):
+    """
+    Revoked access tokens view in admin panel
+    """
+    list_display = ('jti', 'user_id', 'expires_at', 'revoked_at', 'id')
+    search_fields = ('jti',)
+
+
 admin.site.register(CustomUser, CustomUserAdmin)
+admin.site.register(RevokedToken, RevokedTokenAdmin)
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from users.token_revocation import revocation_filter
+
+
+class UserStateCache:
+    """
+    Active state of the users for USERS_STATE_CACHE_TTL seconds, kept in the process.
+    A deleted user is inactive. Changes made by this process drop the entry at once,
+    the other processes see them when the entry expires
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def is_active(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        active = bool(get_user_model().objects.filter(pk=user_id).values_list('is_active', flat=True).first())
+        with self._lock:
+            if len(self._entries) >= settings.USERS_STATE_CACHE_MAX_ENTRIES:
+                self._entries = {key: value for key, value in self._entries.items() if value[1] > now}
+                if len(self._entries) >= settings.USERS_STATE_CACHE_MAX_ENTRIES:
+                    self._entries.clear()
+            self._entries[user_id] = (active, now + settings.USERS_STATE_CACHE_TTL)
+        return active
+
+    def forget(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+user_state_cache = UserStateCache()
+
+
+class RevocationCheckMixin:
+    """
+    Rejecting the access tokens revoked through the token blacklist endpoint
+    """
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocation_filter.is_revoked(validated_token.get(api_settings.JTI_CLAIM, '')):
+            raise InvalidToken(_('Token is revoked'))
+        return validated_token
+
+
+class RevocableJWTAuthentication(RevocationCheckMixin, JWTAuthentication):
+    pass
+
+
+class StatelessJWTAuthentication(RevocationCheckMixin, JWTStatelessUserAuthentication):
+    """
+    Authenticating by the signed user id claim of the access token, request.user is the TOKEN_USER_CLASS
+    built from the token instead of a user loaded from the database on every request
+    """
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if not user_state_cache.is_active(user.id):
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
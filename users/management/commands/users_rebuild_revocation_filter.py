@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.token_revocation import revocation_filter
+
+
+class Command(BaseCommand):
+    """
+    Rebuilding the shared filter of the revoked access tokens
+    """
+    help = 'Write the revoked tokens snapshot from the database and delete the expired revoked tokens'
+
+    def handle(self, *args, **options):
+        revocation_filter.rebuild()
+        self.stdout.write(f'Wrote {revocation_filter.path}')
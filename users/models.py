@@ -43,3 +43,16 @@ class CustomUser(AbstractUser):
 
     def __str__(self):
         return self.email
+
+
+class RevokedToken(models.Model):
+    """
+    Revoked access token, rejected until it expires, see users.token_revocation
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    user_id = models.BigIntegerField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
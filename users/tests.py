@@ -1,3 +1,180 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from datetime import timedelta
+from pathlib import Path
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.authentication import user_state_cache
+from users.models import CustomUser, RevokedToken
+from users.token_revocation import BloomFilter, revocation_filter
+
+NO_RESPONSE_CACHE = {**settings.CACHES, 'responses': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class TemporarySnapshotMixin:
+    """
+    The revoked tokens snapshot of every test in its own directory instead of BASE_DIR/cache
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.snapshot = Path(directory.name) / 'revoked_tokens.bloom'
+        snapshot = override_settings(USERS_REVOCATION_SNAPSHOT=self.snapshot)
+        snapshot.enable()
+        self.addCleanup(snapshot.disable)
+        super().setUp()
+
+
+@override_settings(CACHES=NO_RESPONSE_CACHE)
+class StatelessJWTAuthenticationTests(TemporarySnapshotMixin, TestCase):
+    """
+    The links views trust the user id claim of the access token and check the user state in the process cache
+    """
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user('stateless@example.com', 'password12345')
+        self.client = APIClient()
+        response = self.client.post(
+            '/api/auth/token/', {'email': 'stateless@example.com', 'password': 'password12345'}, format='json',
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+
+    def test_active_user_is_authenticated_from_the_state_cache(self):
+        self.assertEqual(self.client.get('/api/links/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/links/').status_code, 200)
+        # the state is cached, only the links are queried
+        self.assertFalse([query for query in queries if 'users_customuser' in query['sql']])
+
+    def test_deactivated_user_is_rejected_at_once(self):
+        self.assertEqual(self.client.get('/api/links/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/api/links/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'user_inactive')
+
+    def test_deleted_user_is_rejected_at_once(self):
+        self.assertEqual(self.client.get('/api/links/').status_code, 200)
+        self.user.delete()
+        response = self.client.get('/api/links/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'user_inactive')
+
+    def test_change_of_another_process_is_seen_when_the_entry_expires(self):
+        self.assertEqual(self.client.get('/api/links/').status_code, 200)
+        # an update without the signals stands for the other processes
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/links/').status_code, 200)
+        with override_settings(USERS_STATE_CACHE_TTL=0):
+            user_state_cache.forget(self.user.pk)
+            self.assertEqual(self.client.get('/api/links/').status_code, 401)
+            self.assertEqual(self.client.get('/api/links/').status_code, 401)
+
+
+@override_settings(CACHES=NO_RESPONSE_CACHE, USERS_REVOCATION_CHECK_INTERVAL=0)
+class TokenBlacklistTests(TemporarySnapshotMixin, TestCase):
+    """
+    Logging out revokes the access token of the Authorization header along with the refresh token
+    """
+    def setUp(self):
+        super().setUp()
+        CustomUser.objects.create_user('blacklist@example.com', 'password12345')
+        self.client = APIClient()
+
+    def obtain_tokens(self):
+        response = self.client.post(
+            '/api/auth/token/', {'email': 'blacklist@example.com', 'password': 'password12345'}, format='json',
+        )
+        return response.data['access'], response.data['refresh']
+
+    def test_blacklisted_access_token_is_rejected(self):
+        access, refresh = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get('/api/links/').status_code, 200)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/blacklist/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(RevokedToken.objects.count(), 1)
+
+        # both the stateless and the database backed authentication check the revocation
+        for path in ('/api/links/', '/api/users/me/'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response.data['code'], 'token_not_valid')
+        self.client.credentials()
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+        access, refresh = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get('/api/links/').status_code, 200)
+
+    def test_blacklist_without_the_access_token_keeps_it_valid(self):
+        access, refresh = self.obtain_tokens()
+        response = self.client.post('/api/auth/token/blacklist/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(RevokedToken.objects.exists())
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get('/api/links/').status_code, 200)
+
+
+@override_settings(USERS_REVOCATION_CHECK_INTERVAL=0)
+class RevocationFilterTests(TemporarySnapshotMixin, TestCase):
+    """
+    The requests only read the snapshot, it is written by the revocations and the rebuild command
+    """
+    def revoke(self, jti, expires_in=3600):
+        RevokedToken.objects.create(jti=jti, expires_at=timezone.now() + timedelta(seconds=expires_in))
+
+    def test_missing_snapshot_is_checked_in_the_database(self):
+        self.revoke('revoked')
+        self.assertTrue(revocation_filter.is_revoked('revoked'))
+        self.assertFalse(revocation_filter.is_revoked('valid'))
+        self.assertFalse(self.snapshot.exists())
+
+    def test_command_writes_the_snapshot_and_drops_expired_tokens(self):
+        self.revoke('revoked')
+        self.revoke('expired', expires_in=-1)
+        stdout = io.StringIO()
+        call_command('users_rebuild_revocation_filter', stdout=stdout)
+        self.assertEqual(stdout.getvalue().strip(), f'Wrote {self.snapshot}')
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['revoked'])
+        self.assertTrue(revocation_filter.is_revoked('revoked'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(revocation_filter.is_revoked('valid'))
+        self.assertEqual(len(queries), 0)
+
+    def test_old_snapshot_is_not_rebuilt_by_requests(self):
+        revocation_filter.rebuild()
+        os.utime(self.snapshot, (0, 0))
+        self.revoke('revoked')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(revocation_filter.is_revoked('revoked'))
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(os.stat(self.snapshot).st_mtime, 0)
+
+    def test_rewrite_with_the_same_mtime_is_reloaded(self):
+        revocation_filter.rebuild()
+        self.revoke('revoked')
+        self.assertFalse(revocation_filter.is_revoked('revoked'))
+
+        # another process replaces the snapshot within the resolution of the file times
+        mtime_ns = os.stat(self.snapshot).st_mtime_ns
+        bloom = BloomFilter.for_count(1, settings.USERS_REVOCATION_ERROR_RATE)
+        bloom.add('revoked')
+        replacement = self.snapshot.with_suffix('.other')
+        replacement.write_bytes(bloom.dumps())
+        os.replace(replacement, self.snapshot)
+        os.utime(self.snapshot, ns=(mtime_ns, mtime_ns))
+        self.assertTrue(revocation_filter.is_revoked('revoked'))
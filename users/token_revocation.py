@@ -0,0 +1,157 @@
+import hashlib
+import math
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from core.db import write_atomic
+from users.models import RevokedToken
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+HEADER = struct.Struct('<QI')
+
+
+class BloomFilter:
+    """
+    Bloom filter of strings in a bytearray, sized for the expected count and the false positive rate
+    """
+    def __init__(self, size, hashes, bits=None):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bits if bits is not None else bytearray((size + 7) // 8)
+
+    @classmethod
+    def for_count(cls, count, error_rate):
+        count = max(count, 1)
+        size = max(1024, math.ceil(-count * math.log(error_rate) / math.log(2) ** 2))
+        return cls(size, max(1, round(size / count * math.log(2))))
+
+    def positions(self, value):
+        digest = hashlib.sha256(value.encode()).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:16], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(value))
+
+    def dumps(self):
+        return HEADER.pack(self.size, self.hashes) + bytes(self.bits)
+
+    @classmethod
+    def loads(cls, data):
+        size, hashes = HEADER.unpack_from(data)
+        return cls(size, hashes, bytearray(data[HEADER.size:]))
+
+
+class RevocationFilter:
+    """
+    Revoked token ids checked in memory. The filter of the unexpired RevokedToken rows is a file snapshot
+    shared by the processes: a revocation rebuilds it from the database at once and the others reload it
+    when the file changes. The request path only reads the snapshot, `python manage.py users_rebuild_revocation_filter`
+    writes the first one and drops the expired tokens. Only a filter hit is confirmed in the database
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._signature = None
+        self._checked_at = 0.0
+
+    @property
+    def path(self):
+        return str(settings.USERS_REVOCATION_SNAPSHOT)
+
+    def is_revoked(self, jti):
+        bloom = self._current()
+        # without a snapshot every token is checked in the database
+        if bloom is not None and jti not in bloom:
+            return False
+        return RevokedToken.objects.filter(jti=jti, expires_at__gt=timezone.now()).exists()
+
+    def revoke(self, token):
+        """
+        Revoking the access token until it expires
+        """
+        jti = token[api_settings.JTI_CLAIM]
+        try:
+            with write_atomic():
+                RevokedToken.objects.create(
+                    jti=jti,
+                    user_id=token.get(api_settings.USER_ID_CLAIM),
+                    expires_at=datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc),
+                )
+        except IntegrityError:
+            return
+        transaction.on_commit(self.rebuild)
+
+    def rebuild(self):
+        """
+        Writing the filter of the unexpired revoked tokens, the file lock orders concurrent rebuilds
+        so that the last snapshot written was read from the database last
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._file_lock():
+            RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+            jtis = list(RevokedToken.objects.values_list('jti', flat=True))
+            bloom = BloomFilter.for_count(len(jtis), settings.USERS_REVOCATION_ERROR_RATE)
+            for jti in jtis:
+                bloom.add(jti)
+            temporary = f'{self.path}.{os.getpid()}.{threading.get_ident()}'
+            with open(temporary, 'wb') as snapshot:
+                snapshot.write(bloom.dumps())
+            os.replace(temporary, self.path)
+        with self._lock:
+            self._filter, self._signature = bloom, self._stat_signature(os.stat(self.path))
+        return bloom
+
+    def _current(self):
+        now = time.monotonic()
+        if self._filter is not None and now - self._checked_at < settings.USERS_REVOCATION_CHECK_INTERVAL:
+            return self._filter
+        self._checked_at = now
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        signature = self._stat_signature(stat)
+        if signature != self._signature:
+            with open(self.path, 'rb') as snapshot:
+                bloom = BloomFilter.loads(snapshot.read())
+            with self._lock:
+                self._filter, self._signature = bloom, signature
+        return self._filter
+
+    @staticmethod
+    def _stat_signature(stat):
+        # every rebuild replaces the file, a coarse mtime alone could miss a rewrite within its resolution
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(f'{self.path}.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+revocation_filter = RevocationFilter()
@@ -1,5 +1,7 @@
+from django.conf import settings as django_settings
 from django.contrib.auth import get_user_model, update_session_auth_hash
 from django.contrib.auth.tokens import default_token_generator
+from django.utils.dateparse import parse_date
 
 from djoser import signals, utils
 from djoser.compat import get_user_email
@@ -11,10 +13,14 @@ from drf_yasg.utils import swagger_auto_schema
 
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.status import HTTP_201_CREATED, HTTP_200_OK
 
+from links.links_report import top_users
+from links.links_stats import user_link_stats
+
 User = get_user_model()
 
 
@@ -30,6 +36,18 @@ class CustomAutoSchema(SwaggerAutoSchema):
         return tags
 
 
+def report_day(params, name):
+    if not params.get(name):
+        return None
+    try:
+        day = parse_date(params[name])
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({name: ['Expected an ISO 8601 date']})
+    return day
+
+
 class BaseUserViewSetMixin:
     """
     Methods and functionalities for user management
@@ -196,6 +214,70 @@ class CustomUserViewSet(BaseUserViewSetMixin, viewsets.ModelViewSet):
     def me(self, request, *args, **kwargs):
         return super().me(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        method="get",
+        operation_summary='User link statistics',
+        operation_description='Showing the number of user links in total and per link type',
+        responses={
+            HTTP_200_OK: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "total": openapi.Schema(type=openapi.TYPE_INTEGER),
+                    "link_types": openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        additional_properties=openapi.Schema(type=openapi.TYPE_INTEGER),
+                    ),
+                }
+            )
+        },
+    )
+    @action(["get"], detail=False, url_path='me/stats')
+    def me_stats(self, request, *args, **kwargs):
+        return Response(user_link_stats(request.user.id))
+
+    @swagger_auto_schema(
+        method="get",
+        operation_summary='Top users',
+        operation_description='Showing the users with the most links, the earlier registered first on a tie. '
+                              'Links are counted by their creation day, the report is refreshed from the change log',
+        manual_parameters=[
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description='Number of users, 10 by default'),
+            openapi.Parameter('created_after', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+                              description='Count links created on this day or later'),
+            openapi.Parameter('created_before', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+                              description='Count links created on this day or earlier'),
+        ],
+        responses={
+            HTTP_200_OK: openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "id": openapi.Schema(type=openapi.TYPE_INTEGER),
+                        "email": openapi.Schema(type=openapi.TYPE_STRING),
+                        "total": openapi.Schema(type=openapi.TYPE_INTEGER),
+                        "link_types": openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            additional_properties=openapi.Schema(type=openapi.TYPE_INTEGER),
+                        ),
+                    }
+                )
+            )
+        },
+    )
+    @action(["get"], detail=False, url_path='top', permission_classes=[IsAdminUser])
+    def top(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            limit = int(params.get('limit', django_settings.LINKS_REPORT_LIMIT))
+            if not 0 < limit <= django_settings.LINKS_REPORT_MAX_LIMIT:
+                raise ValueError
+        except ValueError:
+            raise ValidationError({'limit': [f'Expected a number from 1 to {django_settings.LINKS_REPORT_MAX_LIMIT}']})
+        first_day, last_day = (report_day(params, name) for name in ('created_after', 'created_before'))
+        return Response(top_users(limit, first_day, last_day))
+
     @swagger_auto_schema(
         operation_summary='Set password',
         operation_description='Setting password',